@@ -32,9 +32,11 @@
     ],
     'data': [
         'security/ir.model.access.csv',
+        'security/freight_security.xml',
         'data/freight_data.xml',
         'data/freight_sequences.xml',
         'data/freight_service_products.xml',
+        'data/freight_cron.xml',
         'views/freight_port_views.xml',
         'views/freight_vessel_views.xml',
         'views/freight_airline_views.xml',
@@ -42,7 +44,14 @@
         'views/freight_container_views.xml',
         'views/freight_shipment_views.xml',
         'views/freight_cost_views.xml',
+        'views/freight_rate_card_views.xml',
         'views/sale_order_views.xml',
+        'wizard/freight_shipment_mass_update_views.xml',
+        'wizard/freight_shipment_import_views.xml',
+        'report/freight_profit_report_views.xml',
+        'views/freight_instrumentation_views.xml',
+        'views/freight_kpi_views.xml',
+        'views/freight_archive_views.xml',
         'views/freight_menu.xml',
     ],
     'demo': [
@@ -0,0 +1 @@
+from . import freight_populate
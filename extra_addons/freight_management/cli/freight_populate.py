@@ -0,0 +1,55 @@
+import argparse
+import logging
+
+import odoo
+from odoo.cli import Command
+from odoo.modules.registry import Registry
+
+_logger = logging.getLogger(__name__)
+
+
+class FreightPopulate(Command):
+    """Load a seeded synthetic freight dataset for load testing"""
+    name = 'freight_populate'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog='odoo-bin freight_populate',
+            description=self.__doc__,
+        )
+        parser.add_argument('-c', '--config', dest='config', help='Odoo configuration file')
+        parser.add_argument('-d', '--database', dest='db_name', required=True, help='Database to populate')
+        parser.add_argument('--ports', type=int, default=1000)
+        parser.add_argument('--vessels', type=int, default=100)
+        parser.add_argument('--shipments', type=int, default=10000)
+        parser.add_argument('--lines-per-shipment', type=int, default=10,
+                            help='Average number of cost lines per shipment')
+        parser.add_argument('--partners', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--end-date', help='Most recent booking date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--batch-size', type=int, default=20000,
+                            help='Shipments written and committed together')
+        parser.add_argument('--tracking', action='store_true',
+                            help='Also write a creation message in the chatter of each shipment')
+        args = parser.parse_args(cmdargs)
+
+        config_args = ['-d', args.db_name]
+        if args.config:
+            config_args += ['-c', args.config]
+        odoo.tools.config.parse_config(config_args)
+
+        registry = Registry(args.db_name)
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            result = env['freight.data.generator']._generate(
+                ports=args.ports,
+                vessels=args.vessels,
+                shipments=args.shipments,
+                lines_per_shipment=args.lines_per_shipment,
+                partners=args.partners,
+                seed=args.seed,
+                tracking=args.tracking,
+                batch_size=args.batch_size,
+                end_date=args.end_date,
+            )
+        _logger.info("Freight data generated: %s", result)
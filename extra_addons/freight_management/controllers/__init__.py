@@ -0,0 +1,3 @@
+from . import freight_export
+from . import freight_metrics
+from . import freight_carrier
@@ -0,0 +1,26 @@
+from werkzeug.exceptions import BadRequest
+
+from odoo import http
+from odoo.http import request
+
+# Largest batch accepted in one request
+MAX_UPDATES = 10000
+
+
+class FreightCarrierController(http.Controller):
+
+    @http.route('/freight/carrier/updates', type='json', auth='user', methods=['POST'])
+    def carrier_updates(self, updates=None, **kwargs):
+        """Apply a batch of carrier status and ETA updates
+
+        ``updates`` is a list of objects, see
+        ``freight.shipment._apply_carrier_updates`` for their keys. The
+        response holds one result per update, in the same order.
+        """
+        if not isinstance(updates, list) or not all(isinstance(update, dict) for update in updates):
+            raise BadRequest("updates must be a list of objects")
+        if len(updates) > MAX_UPDATES:
+            raise BadRequest("at most %s updates per request" % MAX_UPDATES)
+        Shipment = request.env['freight.shipment']
+        Shipment.check_access('write')
+        return {'results': Shipment._apply_carrier_updates(updates)}
@@ -0,0 +1,46 @@
+from werkzeug.exceptions import BadRequest, NotFound
+
+from odoo import api, fields, http
+from odoo.http import request
+from odoo.modules.registry import Registry
+
+EXPORT_MODELS = {
+    'shipment': 'freight.shipment',
+    'cost_line': 'freight.cost.line',
+}
+
+
+class FreightExportController(http.Controller):
+
+    @http.route('/freight/export/<string:model_key>', type='http', auth='user', methods=['GET'])
+    def export_changes(self, model_key, since=None, format='ndjson', **kwargs):
+        """Stream records changed since the ``since`` watermark
+
+        ``since`` is a UTC datetime (the last ``write_date`` received), the
+        output is NDJSON or CSV and deleted records come as tombstones.
+        """
+        model_name = EXPORT_MODELS.get(model_key)
+        if not model_name:
+            raise NotFound()
+        if format not in ('ndjson', 'csv'):
+            raise BadRequest("format must be 'ndjson' or 'csv'")
+        try:
+            since = fields.Datetime.to_datetime(since) if since else None
+        except ValueError:
+            raise BadRequest("since must be a datetime")
+        request.env[model_name].check_access('read')
+
+        # The request cursor is closed once the response is returned, the
+        # generator reads through its own cursor while streaming.
+        dbname, uid, context = request.env.cr.dbname, request.env.uid, dict(request.env.context)
+
+        def generate():
+            with Registry(dbname).cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                yield from env['freight.change.export']._stream_changes(model_name, since=since, fmt=format)
+
+        mimetype = 'application/x-ndjson' if format == 'ndjson' else 'text/csv'
+        return request.make_response(generate(), headers=[
+            ('Content-Type', mimetype),
+            ('Content-Disposition', f'attachment; filename="{model_key}_changes.{format}"'),
+        ])
@@ -0,0 +1,17 @@
+from werkzeug.exceptions import Forbidden
+
+from odoo import http
+from odoo.http import request
+
+
+class FreightMetricsController(http.Controller):
+
+    @http.route('/freight/metrics', type='http', auth='user', methods=['GET'])
+    def metrics(self, **kwargs):
+        """Method instrumentation totals of all workers, Prometheus text format"""
+        if not request.env.user.has_group('base.group_system'):
+            raise Forbidden()
+        return request.make_response(
+            request.env['freight.instrumentation']._export_prometheus(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')],
+        )
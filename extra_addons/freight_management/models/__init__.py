@@ -1,8 +1,22 @@
+from . import freight_master_data
+from . import freight_bulk_tracking
 from . import freight_port
+from . import freight_port_distance
 from . import freight_vessel
 from . import freight_airline
 from . import freight_incoterm
 from . import freight_container
 from . import freight_shipment
 from . import freight_cost
+from . import freight_load_planning
+from . import freight_shipment_event
+from . import freight_rate_card
 from . import sale_order
+from . import res_currency_rate
+from . import res_country
+from . import ir_sequence
+from . import freight_change_export
+from . import freight_kpi
+from . import freight_archive
+from . import freight_data_generator
+from . import freight_instrumentation
@@ -5,21 +5,27 @@ from odoo.exceptions import ValidationError
 class FreightAirline(models.Model):
     _name = 'freight.airline'
     _description = 'Freight Airline Configuration'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['freight.master.data.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'name'
     _rec_name = 'name'
+    _code_label = 'Airline'
+    _name_search_code_fields = ['code', 'iata_code']
+    _master_data_cache_fields = ['code', 'name', 'active', 'iata_code']
+    _display_name_depends = ['code', 'name', 'country_id.code']
 
     code = fields.Char(
         string='Airline Code',
         required=True,
         size=10,
         tracking=True,
+        index='trigram',
         help='Unique airline identification code (IATA/ICAO)'
     )
     name = fields.Char(
         string='Airline Name',
         required=True,
         tracking=True,
+        index='trigram',
         help='Full name of the airline'
     )
     country_id = fields.Many2one(
@@ -48,6 +54,7 @@ class FreightAirline(models.Model):
         string='IATA Code',
         size=3,
         tracking=True,
+        index='trigram',
         help='International Air Transport Association code'
     )
     airline_type = fields.Selection([
@@ -109,13 +116,6 @@ class FreightAirline(models.Model):
         help='Additional information about the airline'
     )
 
-    @api.constrains('code')
-    def _check_unique_code(self):
-        """Ensure airline code is unique"""
-        for record in self:
-            if self.search_count([('code', '=', record.code), ('id', '!=', record.id)]) > 0:
-                raise ValidationError(_('Airline code must be unique. Code "%s" already exists.') % record.code)
-
     @api.constrains('iata_code')
     def _check_iata_code(self):
         """Validate IATA code format"""
@@ -136,7 +136,7 @@ class FreightAirline(models.Model):
                 if not record.icao_code.isalnum():
                     raise ValidationError(_('ICAO code must contain only letters and numbers.'))
 
-    def name_get(self):
+    def _name_get_uncached(self):
         """Custom name display: [CODE] Name"""
         result = []
         for record in self:
@@ -145,16 +145,3 @@ class FreightAirline(models.Model):
                 name += f" ({record.country_id.code})"
             result.append((record.id, name))
         return result
-
-    @api.model
-    def name_search(self, name='', args=None, operator='ilike', limit=100):
-        """Enhanced search by code or name"""
-        args = args or []
-        if name:
-            airlines = self.search([
-                '|', '|', ('code', operator, name), 
-                ('name', operator, name), 
-                ('iata_code', operator, name)
-            ] + args, limit=limit)
-            return airlines.name_get()
-        return super().name_search(name, args, operator, limit)
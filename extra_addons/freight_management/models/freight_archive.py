@@ -0,0 +1,622 @@
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+ARCHIVE_AGE_PARAM = 'freight_management.archive_after_days'
+DEFAULT_ARCHIVE_AGE = 730
+ARCHIVE_STATES = ('paid', 'cancelled')
+
+# Columns copied as is from the hot tables, audit columns included
+ARCHIVED_SHIPMENT_COLUMNS = [
+    'reference', 'import_ref', 'state', 'company_id', 'customer_id', 'shipper_id', 'consignee_id', 'notify_party_id',
+    'origin_port_id', 'destination_port_id', 'transport_mode', 'direction', 'service_type', 'incoterm_id',
+    'cargo_description', 'total_weight', 'total_volume', 'number_of_packages', 'vessel_id', 'airline_id',
+    'voyage_flight_number', 'booking_date', 'estimated_departure', 'actual_departure', 'estimated_arrival',
+    'actual_arrival', 'delivery_date', 'currency_id', 'total_sell_cost', 'total_buy_cost', 'profit_margin',
+    'quotation_id', 'special_instructions', 'internal_notes',
+    'create_uid', 'create_date', 'write_uid', 'write_date',
+]
+ARCHIVED_COST_LINE_COLUMNS = [
+    'sequence', 'cost_type', 'product_id', 'product_uom_id', 'description', 'partner_id', 'quantity',
+    'unit_price', 'amount', 'currency_id', 'invoice_line_id', 'invoiced',
+    'create_uid', 'create_date', 'write_uid', 'write_date',
+]
+ARCHIVED_PACKAGE_COLUMNS = [
+    'sequence', 'name', 'quantity', 'length', 'width', 'height', 'weight', 'stackable',
+    'create_uid', 'create_date', 'write_uid', 'write_date',
+]
+
+SELECTIONS = {
+    'transport_mode': [
+        ('air', 'Air Freight'),
+        ('ocean', 'Ocean Freight'),
+        ('land', 'Land Freight'),
+    ],
+    'direction': [
+        ('import', 'Import'),
+        ('export', 'Export'),
+    ],
+    'service_type': [
+        ('fcl', 'Full Container Load (FCL)'),
+        ('lcl', 'Less than Container Load (LCL)'),
+        ('ftl', 'Full Truck Load (FTL)'),
+        ('ltl', 'Less than Truck Load (LTL)'),
+        ('air_freight', 'Air Freight'),
+        ('express', 'Express Service'),
+    ],
+}
+
+
+class FreightShipmentArchive(models.Model):
+    _name = 'freight.shipment.archive'
+    _description = 'Archived Freight Shipment'
+    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _mail_post_access = 'read'
+    _order = 'booking_date desc, id desc'
+    _rec_name = 'reference'
+
+    original_id = fields.Integer(
+        string='Original Shipment ID',
+        readonly=True,
+        index=True
+    )
+
+    archived_at = fields.Datetime(
+        string='Archived On',
+        readonly=True
+    )
+
+    reference = fields.Char(
+        string='Shipment Reference',
+        readonly=True,
+        index='trigram'
+    )
+
+    import_ref = fields.Char(
+        string='Import Reference',
+        readonly=True,
+        index=True
+    )
+
+    state = fields.Selection([
+        ('paid', 'Paid'),
+        ('cancelled', 'Cancelled')
+    ], string='Status', readonly=True)
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        readonly=True,
+        index=True
+    )
+
+    customer_id = fields.Many2one(
+        'res.partner',
+        string='Customer',
+        readonly=True,
+        index=True
+    )
+
+    shipper_id = fields.Many2one(
+        'res.partner',
+        string='Shipper',
+        readonly=True
+    )
+
+    consignee_id = fields.Many2one(
+        'res.partner',
+        string='Consignee',
+        readonly=True
+    )
+
+    notify_party_id = fields.Many2one(
+        'res.partner',
+        string='Notify Party',
+        readonly=True
+    )
+
+    origin_port_id = fields.Many2one(
+        'freight.port',
+        string='Origin Port',
+        readonly=True
+    )
+
+    destination_port_id = fields.Many2one(
+        'freight.port',
+        string='Destination Port',
+        readonly=True
+    )
+
+    transport_mode = fields.Selection(
+        SELECTIONS['transport_mode'],
+        string='Transport Mode',
+        readonly=True
+    )
+
+    direction = fields.Selection(
+        SELECTIONS['direction'],
+        string='Direction',
+        readonly=True
+    )
+
+    service_type = fields.Selection(
+        SELECTIONS['service_type'],
+        string='Service Type',
+        readonly=True
+    )
+
+    incoterm_id = fields.Many2one(
+        'freight.incoterm',
+        string='Incoterm',
+        readonly=True
+    )
+
+    cargo_description = fields.Text(
+        string='Cargo Description',
+        readonly=True
+    )
+
+    total_weight = fields.Float(
+        string='Total Weight (KG)',
+        readonly=True
+    )
+
+    total_volume = fields.Float(
+        string='Total Volume (CBM)',
+        readonly=True
+    )
+
+    number_of_packages = fields.Integer(
+        string='Number of Packages',
+        readonly=True
+    )
+
+    vessel_id = fields.Many2one(
+        'freight.vessel',
+        string='Vessel',
+        readonly=True
+    )
+
+    airline_id = fields.Many2one(
+        'freight.airline',
+        string='Airline',
+        readonly=True
+    )
+
+    voyage_flight_number = fields.Char(
+        string='Voyage/Flight Number',
+        readonly=True
+    )
+
+    booking_date = fields.Datetime(
+        string='Booking Date',
+        readonly=True
+    )
+
+    estimated_departure = fields.Datetime(
+        string='Estimated Departure',
+        readonly=True
+    )
+
+    actual_departure = fields.Datetime(
+        string='Actual Departure',
+        readonly=True
+    )
+
+    estimated_arrival = fields.Datetime(
+        string='Estimated Arrival',
+        readonly=True
+    )
+
+    actual_arrival = fields.Datetime(
+        string='Actual Arrival',
+        readonly=True
+    )
+
+    delivery_date = fields.Datetime(
+        string='Delivery Date',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        'res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    total_sell_cost = fields.Monetary(
+        string='Total Sell Cost',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    total_buy_cost = fields.Monetary(
+        string='Total Buy Cost',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    profit_margin = fields.Monetary(
+        string='Profit Margin',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    quotation_id = fields.Many2one(
+        'freight.quotation',
+        string='Related Quotation',
+        readonly=True
+    )
+
+    special_instructions = fields.Text(
+        string='Special Instructions',
+        readonly=True
+    )
+
+    internal_notes = fields.Text(
+        string='Internal Notes',
+        readonly=True
+    )
+
+    cost_line_ids = fields.One2many(
+        'freight.cost.line.archive',
+        'archive_shipment_id',
+        string='Cost Lines',
+        readonly=True
+    )
+
+    package_ids = fields.One2many(
+        'freight.shipment.package.archive',
+        'archive_shipment_id',
+        string='Packages',
+        readonly=True
+    )
+
+    event_ids = fields.One2many(
+        'freight.shipment.event',
+        'archive_shipment_id',
+        string='Milestone Events',
+        readonly=True
+    )
+
+    @api.model
+    def _get_archive_cutoff(self):
+        days = int(self.env['ir.config_parameter'].sudo().get_param(ARCHIVE_AGE_PARAM, DEFAULT_ARCHIVE_AGE))
+        return fields.Datetime.now() - timedelta(days=days)
+
+    @api.model
+    def _archive_shipments(self, shipments):
+        """Move ``shipments`` with their cost lines to the archive tables
+
+        Shipments, cost lines and packages are copied with one INSERT ...
+        SELECT each. The milestone events, chatter, followers, attachments
+        and activities are re-pointed to the archive records, the quotations
+        keep a link to them and the profitability report rows are detached
+        from the hot records, so history stays visible and reportable. The
+        hot records are then deleted through the ORM, which logs them for
+        the change export and the KPI snapshot: nothing the unlink cascades
+        to still points at them but the latest milestone status, which the
+        events hold as well.
+        """
+        if not shipments:
+            return self.browse()
+        self.env.flush_all()
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO freight_shipment_archive (original_id, archived_at, {columns})
+            SELECT id, NOW() AT TIME ZONE 'UTC', {columns}
+              FROM freight_shipment
+             WHERE id = ANY(%s)
+         RETURNING original_id, id
+        """.format(columns=', '.join(ARCHIVED_SHIPMENT_COLUMNS)), (shipments.ids,))
+        mapping = cr.fetchall()
+        shipment_ids = [row[0] for row in mapping]
+        archive_ids = [row[1] for row in mapping]
+        params = {'shipment_ids': shipment_ids, 'archive_ids': archive_ids}
+        moved = "unnest(%(shipment_ids)s::int[], %(archive_ids)s::int[]) AS m(shipment_id, archive_id)"
+
+        cr.execute("""
+            INSERT INTO freight_cost_line_archive (archive_shipment_id, original_id, {columns})
+            SELECT m.archive_id, l.id, {line_columns}
+              FROM freight_cost_line l
+              JOIN {moved} ON m.shipment_id = l.shipment_id
+        """.format(
+            columns=', '.join(ARCHIVED_COST_LINE_COLUMNS),
+            line_columns=', '.join('l.%s' % column for column in ARCHIVED_COST_LINE_COLUMNS),
+            moved=moved,
+        ), params)
+        cr.execute("""
+            INSERT INTO freight_shipment_package_archive (archive_shipment_id, original_id, {columns})
+            SELECT m.archive_id, p.id, {package_columns}
+              FROM freight_shipment_package p
+              JOIN {moved} ON m.shipment_id = p.shipment_id
+        """.format(
+            columns=', '.join(ARCHIVED_PACKAGE_COLUMNS),
+            package_columns=', '.join('p.%s' % column for column in ARCHIVED_PACKAGE_COLUMNS),
+            moved=moved,
+        ), params)
+        # Events are append-only, they move to the archive record as they are
+        cr.execute("""
+            UPDATE freight_shipment_event e
+               SET archive_shipment_id = m.archive_id, shipment_id = NULL
+              FROM {moved}
+             WHERE e.shipment_id = m.shipment_id
+        """.format(moved=moved), params)
+        cr.execute("""
+            UPDATE mail_message msg
+               SET model = 'freight.shipment.archive', res_id = m.archive_id
+              FROM {moved}
+             WHERE msg.model = 'freight.shipment' AND msg.res_id = m.shipment_id
+        """.format(moved=moved), params)
+        cr.execute("""
+            UPDATE mail_followers f
+               SET res_model = 'freight.shipment.archive', res_id = m.archive_id
+              FROM {moved}
+             WHERE f.res_model = 'freight.shipment' AND f.res_id = m.shipment_id
+        """.format(moved=moved), params)
+        cr.execute("""
+            UPDATE ir_attachment a
+               SET res_model = 'freight.shipment.archive', res_id = m.archive_id
+              FROM {moved}
+             WHERE a.res_model = 'freight.shipment' AND a.res_id = m.shipment_id
+        """.format(moved=moved), params)
+        cr.execute("""
+            UPDATE mail_activity act
+               SET res_model = 'freight.shipment.archive', res_id = m.archive_id,
+                   res_model_id = (SELECT id FROM ir_model WHERE model = 'freight.shipment.archive')
+              FROM {moved}
+             WHERE act.res_model = 'freight.shipment' AND act.res_id = m.shipment_id
+        """.format(moved=moved), params)
+        cr.execute("""
+            UPDATE freight_quotation q
+               SET archive_shipment_id = m.archive_id
+              FROM {moved}
+             WHERE q.shipment_id = m.shipment_id
+        """.format(moved=moved), params)
+        cr.execute("""
+            UPDATE freight_profit_report r
+               SET archive_shipment_id = m.archive_id, shipment_id = NULL, cost_line_id = NULL
+              FROM {moved}
+             WHERE r.shipment_id = m.shipment_id
+        """.format(moved=moved), params)
+        self.env.invalidate_all()
+
+        shipments.with_context(active_test=False).unlink()
+        return self.browse(archive_ids)
+
+    @api.model
+    def _cron_archive(self, batch_size=1000, limit=None):
+        """Archive paid and cancelled shipments untouched for the configured age
+
+        Works by batches, each committed, so the hot table shrinks steadily
+        and a long first run can be interrupted.
+        """
+        Shipment = self.env['freight.shipment'].with_context(active_test=False)
+        domain = [('state', 'in', ARCHIVE_STATES), ('write_date', '<', self._get_archive_cutoff())]
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        archived = 0
+        while limit is None or archived < limit:
+            count = batch_size if limit is None else min(batch_size, limit - archived)
+            shipments = Shipment.search(domain, order='id', limit=count)
+            if not shipments:
+                break
+            self._archive_shipments(shipments)
+            archived += len(shipments)
+            if auto_commit:
+                self.env.cr.commit()
+        _logger.info("Freight archive: %s shipments moved to cold storage", archived)
+        return archived
+
+
+class FreightCostLineArchive(models.Model):
+    _name = 'freight.cost.line.archive'
+    _description = 'Archived Freight Cost Line'
+    _order = 'archive_shipment_id, sequence, id'
+    _rec_name = 'description'
+
+    archive_shipment_id = fields.Many2one(
+        'freight.shipment.archive',
+        string='Archived Shipment',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    original_id = fields.Integer(
+        string='Original Cost Line ID',
+        readonly=True
+    )
+
+    sequence = fields.Integer(
+        string='Sequence',
+        readonly=True
+    )
+
+    cost_type = fields.Selection([
+        ('sell', 'Sell Cost (Customer)'),
+        ('buy', 'Buy Cost (Vendor)')
+    ], string='Cost Type', readonly=True)
+
+    product_id = fields.Many2one(
+        'product.product',
+        string='Service Product',
+        readonly=True
+    )
+
+    product_uom_id = fields.Many2one(
+        'uom.uom',
+        string='Unit of Measure',
+        readonly=True
+    )
+
+    description = fields.Char(
+        string='Description',
+        readonly=True
+    )
+
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Vendor/Customer',
+        readonly=True
+    )
+
+    quantity = fields.Float(
+        string='Quantity',
+        readonly=True
+    )
+
+    unit_price = fields.Monetary(
+        string='Unit Price',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    amount = fields.Monetary(
+        string='Total Amount',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        'res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    invoice_line_id = fields.Many2one(
+        'account.move.line',
+        string='Invoice Line',
+        readonly=True
+    )
+
+    invoiced = fields.Boolean(
+        string='Invoiced',
+        readonly=True
+    )
+
+
+class FreightShipmentPackageArchive(models.Model):
+    _name = 'freight.shipment.package.archive'
+    _description = 'Archived Freight Shipment Package'
+    _order = 'archive_shipment_id, sequence, id'
+
+    archive_shipment_id = fields.Many2one(
+        'freight.shipment.archive',
+        string='Archived Shipment',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    original_id = fields.Integer(
+        string='Original Package ID',
+        readonly=True
+    )
+
+    sequence = fields.Integer(
+        string='Sequence',
+        readonly=True
+    )
+
+    name = fields.Char(
+        string='Description',
+        readonly=True
+    )
+
+    quantity = fields.Integer(
+        string='Quantity',
+        readonly=True
+    )
+
+    length = fields.Float(
+        string='Length (m)',
+        readonly=True
+    )
+
+    width = fields.Float(
+        string='Width (m)',
+        readonly=True
+    )
+
+    height = fields.Float(
+        string='Height (m)',
+        readonly=True
+    )
+
+    weight = fields.Float(
+        string='Weight per Package (KG)',
+        readonly=True
+    )
+
+    stackable = fields.Boolean(
+        string='Stackable',
+        readonly=True
+    )
+
+
+class FreightShipmentEvent(models.Model):
+    _inherit = 'freight.shipment.event'
+
+    # Events of archived shipments point to their archive record instead
+    shipment_id = fields.Many2one(
+        required=False
+    )
+
+    archive_shipment_id = fields.Many2one(
+        'freight.shipment.archive',
+        string='Archived Shipment',
+        readonly=True,
+        index='btree_not_null',
+        ondelete='cascade'
+    )
+
+    _sql_constraints = [
+        ('shipment_or_archive_required',
+         'CHECK(shipment_id IS NOT NULL OR archive_shipment_id IS NOT NULL)',
+         'A milestone event must belong to a shipment or an archived shipment.'),
+    ]
+
+
+class FreightShipment(models.Model):
+    _inherit = 'freight.shipment'
+
+    def action_move_to_archive(self):
+        """Move the selected paid or cancelled shipments to cold storage now"""
+        invalid = self.filtered(lambda s: s.state not in ARCHIVE_STATES)
+        if invalid:
+            raise UserError(_(
+                "Only paid or cancelled shipments can be moved to the archive: %s",
+                ', '.join(invalid.mapped('reference'))
+            ))
+        archives = self.env['freight.shipment.archive']._archive_shipments(self)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Shipment Archive'),
+            'res_model': 'freight.shipment.archive',
+            'domain': [('id', 'in', archives.ids)],
+            'view_mode': 'list,form',
+            'target': 'current',
+        }
+
+
+class FreightQuotation(models.Model):
+    _inherit = 'freight.quotation'
+
+    archive_shipment_id = fields.Many2one(
+        'freight.shipment.archive',
+        string='Archived Shipment',
+        readonly=True,
+        copy=False,
+        help='Shipment of this quotation, moved to the archive'
+    )
+
+    def action_create_shipment(self):
+        # An archived shipment still is the shipment of its quotation
+        return super(FreightQuotation, self.filtered(lambda q: not q.archive_shipment_id)).action_create_shipment()
@@ -0,0 +1,44 @@
+from odoo import models, Command
+
+
+class FreightBulkTrackingMixin(models.AbstractModel):
+    _name = 'freight.bulk.tracking.mixin'
+    _description = 'Freight Bulk Tracking Mixin'
+
+    def _message_log_tracking_batch(self, fnames, initial_values, new_values=None):
+        """Log one tracking message per changed record in a single batch
+
+        :param initial_values: {record id: {field name: value before}}
+        :param new_values: {record id: {field name: value after}}, read from
+            the records when not given (e.g. after an ORM write)
+        """
+        fields_info = self.fields_get(fnames, attributes=('string', 'type', 'selection', 'currency_field'))
+        TrackingValue = self.env['mail.tracking.value']
+        author_id, email_from = self._message_compute_author(raise_on_email=False)
+        base_values = {
+            'author_id': author_id,
+            'email_from': email_from,
+            'is_internal': True,
+            'message_type': 'notification',
+            'model': self._name,
+            'subtype_id': self.env['ir.model.data']._xmlid_to_res_id('mail.mt_note'),
+            'body': '',
+        }
+        values_list = []
+        for record in self:
+            tracking_values = []
+            for fname in fnames:
+                initial_value = initial_values[record.id][fname]
+                new_value = new_values[record.id][fname] if new_values else record[fname]
+                if initial_value != new_value:
+                    tracking_values.append(TrackingValue._create_tracking_values(
+                        initial_value, new_value, fname, fields_info[fname], record
+                    ))
+            if tracking_values:
+                values_list.append(dict(
+                    base_values,
+                    res_id=record.id,
+                    tracking_value_ids=[Command.create(value) for value in tracking_values],
+                ))
+        if values_list:
+            self.sudo()._message_create(values_list)
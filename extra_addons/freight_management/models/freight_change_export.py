@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+
+# Fields exported for each model, in CSV column order
+EXPORT_FIELDS = {
+    'freight.shipment': [
+        'reference', 'state', 'customer_id', 'origin_port_id', 'destination_port_id',
+        'transport_mode', 'direction', 'service_type', 'vessel_id', 'airline_id',
+        'voyage_flight_number', 'booking_date', 'estimated_departure', 'actual_departure',
+        'estimated_arrival', 'actual_arrival', 'delivery_date', 'total_weight', 'total_volume',
+        'currency_id', 'total_sell_cost', 'total_buy_cost', 'profit_margin', 'quotation_id',
+        'active',
+    ],
+    'freight.cost.line': [
+        'shipment_id', 'quotation_id', 'cost_type', 'product_id', 'description', 'partner_id',
+        'quantity', 'unit_price', 'amount', 'currency_id', 'invoiced',
+    ],
+}
+
+
+class FreightDeletionLog(models.Model):
+    _name = 'freight.deletion.log'
+    _description = 'Freight Deletion Log'
+    _order = 'deleted_at, id'
+    _log_access = False
+
+    model = fields.Char(
+        string='Model',
+        required=True,
+        index=True
+    )
+    
+    res_id = fields.Integer(
+        string='Record ID',
+        required=True
+    )
+    
+    deleted_at = fields.Datetime(
+        string='Deleted At',
+        required=True,
+        index=True,
+        default=lambda self: self.env.cr.now()
+    )
+
+    def init(self):
+        super().init()
+        # Keyset pagination of the tombstones of each model
+        tools.create_index(self.env.cr, 'freight_deletion_log_model_deleted_at_id_idx', self._table,
+                           ['model', 'deleted_at', 'id'])
+
+    @api.model
+    def _log_deletions(self, records):
+        """Record tombstones for records about to be deleted
+
+        Stamped with the transaction time, like the ``write_date`` of the
+        live records.
+        """
+        if records:
+            deleted_at = self.env.cr.now()
+            self.create([
+                {'model': records._name, 'res_id': record_id, 'deleted_at': deleted_at}
+                for record_id in records.ids
+            ])
+
+
+class FreightChangeExport(models.AbstractModel):
+    _name = 'freight.change.export'
+    _description = 'Freight Change Data Export'
+
+    @api.model
+    def _iter_changes(self, model_name, since=None, batch_size=1000):
+        """Yield the records of ``model_name`` changed after ``since``
+
+        Records are read in (write_date, id) keyset pages, so each page is
+        an index range scan and memory does not grow with the result. The
+        deletions logged since the watermark follow as tombstones, paged
+        the same way on (deleted_at, id).
+        """
+        Model = self.env[model_name]
+        fnames = EXPORT_FIELDS[model_name]
+        for rows in self._iter_pages(Model._table, 'write_date', SQL("TRUE"), since, batch_size):
+            write_dates = dict(rows)
+            for values in Model.browse(list(write_dates)).read(fnames):
+                values['write_date'] = write_dates[values['id']]
+                yield self._export_values(values, fnames)
+            self.env.invalidate_all()
+
+        condition = SQL("model = %s", model_name)
+        for rows in self._iter_pages('freight_deletion_log', 'deleted_at', condition, since, batch_size, 'res_id'):
+            for _id, deleted_at, res_id in rows:
+                yield {'id': res_id, 'write_date': fields.Datetime.to_string(deleted_at), 'deleted': True}
+
+    @api.model
+    def _iter_pages(self, table, date_column, condition, since, batch_size, *columns):
+        """Yield pages of (id, date, *columns) rows of ``table`` after ``since``
+
+        Rows matching ``condition`` are read in (date, id) order, each page
+        starting after the last row of the previous one.
+        """
+        date_sql = SQL.identifier(date_column)
+        select = SQL(", ").join([SQL.identifier('id'), date_sql] + [SQL.identifier(column) for column in columns])
+        last_date, last_id = since, 0
+        while True:
+            if last_date:
+                keyset = SQL("(%s > %s OR (%s = %s AND id > %s))", date_sql, last_date, date_sql, last_date, last_id)
+            else:
+                keyset = SQL("TRUE")
+            self.env.cr.execute(SQL(
+                "SELECT %s FROM %s WHERE %s AND %s ORDER BY %s, id LIMIT %s",
+                select, SQL.identifier(table), condition, keyset, date_sql, batch_size,
+            ))
+            rows = self.env.cr.fetchall()
+            if not rows:
+                return
+            yield rows
+            last_id, last_date = rows[-1][:2]
+
+    @api.model
+    def _export_values(self, values, fnames):
+        """Flatten read() values to JSON/CSV friendly ones"""
+        result = {'id': values['id'], 'write_date': fields.Datetime.to_string(values['write_date']), 'deleted': False}
+        for fname in fnames:
+            value = values[fname]
+            if isinstance(value, tuple):
+                value = value[0]
+            elif hasattr(value, 'isoformat'):
+                value = fields.Datetime.to_string(value)
+            result[fname] = value
+        return result
+
+    @api.model
+    def _stream_changes(self, model_name, since=None, fmt='ndjson'):
+        """Yield the changes of ``model_name`` as NDJSON lines or CSV rows"""
+        changes = self._iter_changes(model_name, since=since)
+        if fmt == 'ndjson':
+            for values in changes:
+                yield json.dumps(values, default=str) + '\n'
+            return
+        columns = ['id', 'write_date', 'deleted'] + EXPORT_FIELDS[model_name]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, restval='')
+        writer.writeheader()
+        for values in changes:
+            writer.writerow(values)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
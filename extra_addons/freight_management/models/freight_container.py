@@ -5,21 +5,26 @@ from odoo.exceptions import ValidationError
 class FreightContainer(models.Model):
     _name = 'freight.container'
     _description = 'Freight Container/Package Configuration'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['freight.master.data.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'name'
     _rec_name = 'name'
+    _code_label = 'Container/Package'
+    _master_data_cache_fields = ['code', 'name', 'active', 'ocean_compatible', 'air_compatible', 'land_compatible']
+    _display_name_depends = ['code', 'name', 'size', 'volume']
 
     code = fields.Char(
         string='Container/Package Code',
         required=True,
         size=20,
         tracking=True,
+        index='trigram',
         help='Unique container or package identification code'
     )
     name = fields.Char(
         string='Container/Package Name',
         required=True,
         tracking=True,
+        index='trigram',
         help='Full name or description of the container/package'
     )
     
@@ -152,13 +157,6 @@ class FreightContainer(models.Model):
         help='Additional information about the container/package'
     )
 
-    @api.constrains('code')
-    def _check_unique_code(self):
-        """Ensure container code is unique"""
-        for record in self:
-            if self.search_count([('code', '=', record.code), ('id', '!=', record.id)]) > 0:
-                raise ValidationError(_('Container/Package code must be unique. Code "%s" already exists.') % record.code)
-
     @api.constrains('length', 'width', 'height')
     def _check_dimensions(self):
         """Validate dimensions are positive"""
@@ -198,7 +196,7 @@ class FreightContainer(models.Model):
         if self.refrigerated and self.is_container:
             self.container_type = 'reefer'
 
-    def name_get(self):
+    def _name_get_uncached(self):
         """Custom name display: [CODE] Name (Size)"""
         result = []
         for record in self:
@@ -210,17 +208,6 @@ class FreightContainer(models.Model):
             result.append((record.id, name))
         return result
 
-    @api.model
-    def name_search(self, name='', args=None, operator='ilike', limit=100):
-        """Enhanced search by code or name"""
-        args = args or []
-        if name:
-            containers = self.search([
-                '|', ('code', operator, name), ('name', operator, name)
-            ] + args, limit=limit)
-            return containers.name_get()
-        return super().name_search(name, args, operator, limit)
-
     @api.model
     def get_standard_containers(self):
         """Return list of standard container types"""
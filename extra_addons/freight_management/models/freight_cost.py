@@ -1,7 +1,16 @@
-from odoo import models, fields, api, _
+import logging
+import threading
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
+from collections import defaultdict
 from datetime import timedelta
 
+_logger = logging.getLogger(__name__)
+
+# Key of the currency rate cache in ``cr.cache``
+CURRENCY_RATE_CACHE = 'freight_currency_rates'
+
 
 class FreightCostLine(models.Model):
     _name = 'freight.cost.line'
@@ -11,7 +20,8 @@ class FreightCostLine(models.Model):
     shipment_id = fields.Many2one(
         'freight.shipment',
         string='Shipment',
-        ondelete='cascade'
+        ondelete='cascade',
+        index=True
     )
     
     quotation_id = fields.Many2one(
@@ -75,8 +85,11 @@ class FreightCostLine(models.Model):
     currency_id = fields.Many2one(
         'res.currency',
         string='Currency',
-        related='shipment_id.currency_id',
-        store=True
+        compute='_compute_currency_id',
+        store=True,
+        readonly=False,
+        precompute=True,
+        help='Currency of this line, defaults to the currency of its shipment or quotation'
     )
     
     invoice_line_id = fields.Many2one(
@@ -91,6 +104,75 @@ class FreightCostLine(models.Model):
         store=True
     )
 
+    def init(self):
+        super().init()
+        # Keyset pagination of the change data export
+        tools.create_index(self.env.cr, 'freight_cost_line_write_date_id_idx', self._table, ['write_date', 'id'])
+
+    def unlink(self):
+        self.env['freight.deletion.log'].sudo()._log_deletions(self)
+        return super(FreightCostLine, self).unlink()
+
+    @api.depends('shipment_id.currency_id', 'quotation_id.currency_id')
+    def _compute_currency_id(self):
+        for line in self:
+            if not line.currency_id:
+                line.currency_id = (
+                    line.shipment_id.currency_id or line.quotation_id.currency_id or self.env.company.currency_id
+                )
+
+    @api.model
+    def _get_currency_rates(self, keys, company=None):
+        """Company rates of the (currency id, date) ``keys``
+
+        Rates are kept in a cursor level cache, dropped whenever a currency
+        rate changes. Each date missing from the cache costs one query for
+        all of its currencies, whatever the number of lines converted.
+        """
+        company = company or self.env.company
+        cache = self.env.cr.cache.setdefault(CURRENCY_RATE_CACHE, {})
+        missing = defaultdict(set)
+        for currency_id, date in keys:
+            if (company.id, currency_id, date) not in cache:
+                missing[date].add(currency_id)
+        for date, currency_ids in missing.items():
+            rates = self.env['res.currency'].browse(currency_ids)._get_rates(company, date)
+            for currency_id in currency_ids:
+                cache[company.id, currency_id, date] = rates.get(currency_id) or 1.0
+        return {(currency_id, date): cache[company.id, currency_id, date] for currency_id, date in keys}
+
+    @api.model
+    def _convert_amount(self, amount, from_currency, to_currency, date):
+        """Convert ``amount`` through the cached rates, no rounding"""
+        if not from_currency or not to_currency or from_currency == to_currency:
+            return amount
+        rates = self._get_currency_rates({(from_currency.id, date), (to_currency.id, date)})
+        return amount * rates[to_currency.id, date] / rates[from_currency.id, date]
+
+    @api.model
+    def _sum_converted(self, amounts, targets):
+        """Sum amounts in the currency of their owner
+
+        ``amounts`` are ((owner, bucket), currency id, amount) tuples and
+        ``targets`` maps each owner to its (currency, conversion date). The
+        rates of every currency and date involved are fetched up front.
+
+        :return: defaultdict {(owner, bucket): total}
+        """
+        keys = set()
+        for (owner, _bucket), currency_id, _amount in amounts:
+            to_currency, date = targets[owner]
+            if currency_id and to_currency and currency_id != to_currency.id:
+                keys |= {(currency_id, date), (to_currency.id, date)}
+        rates = self._get_currency_rates(keys)
+        totals = defaultdict(float)
+        for (owner, bucket), currency_id, amount in amounts:
+            to_currency, date = targets[owner]
+            if currency_id and to_currency and currency_id != to_currency.id:
+                amount = amount * rates[to_currency.id, date] / rates[currency_id, date]
+            totals[owner, bucket] += amount
+        return totals
+
     @api.depends('invoice_line_id')
     def _compute_invoiced(self):
         for line in self:
@@ -98,10 +180,30 @@ class FreightCostLine(models.Model):
     
     @api.onchange('product_id')
     def _onchange_product_id(self):
-        """Update description and unit price when product is selected"""
+        """Update description and unit price when product is selected
+
+        Quotation lines are priced from the lane rate card of the product
+        when one has a break for the quotation, converted to its currency.
+        The product prices are the fallback.
+        """
         if self.product_id:
             self.description = self.product_id.name
-            if self.cost_type == 'sell':
+            card = self.env['freight.rate.card']
+            rates = None
+            if self.quotation_id:
+                card = self.env['freight.rate.card']._find_for_quotations(self.quotation_id).get(
+                    self.quotation_id.id, card
+                ).filtered(lambda c: c.product_id == self.product_id)
+            if card:
+                quantity = card._get_quantity(self.quotation_id.estimated_weight, self.quotation_id.estimated_volume)
+                rates = card._get_rates(quantity, self.quotation_id.currency_id, self.quotation_id.quotation_date)
+            if rates:
+                buy_rate, sell_rate = rates
+                self.quantity = quantity
+                self.unit_price = sell_rate if self.cost_type == 'sell' else buy_rate
+                if self.cost_type == 'buy' and card.vendor_id:
+                    self.partner_id = card.vendor_id
+            elif self.cost_type == 'sell':
                 self.unit_price = self.product_id.list_price
             else:
                 self.unit_price = self.product_id.standard_price
@@ -143,7 +245,7 @@ class FreightCostLine(models.Model):
 class FreightQuotation(models.Model):
     _name = 'freight.quotation'
     _description = 'Freight Quotation'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['freight.bulk.tracking.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'create_date desc'
     _rec_name = 'reference'
 
@@ -205,6 +307,12 @@ class FreightQuotation(models.Model):
         ('express', 'Express Service')
     ], string='Service Type')
     
+    container_id = fields.Many2one(
+        'freight.container',
+        string='Container Type',
+        help='Container type used to select the lane rate cards'
+    )
+    
     # Cargo Information
     cargo_description = fields.Text(
         string='Cargo Description'
@@ -231,6 +339,14 @@ class FreightQuotation(models.Model):
         default=lambda self: fields.Date.today() + timedelta(days=30)
     )
     
+    estimated_departure = fields.Datetime(
+        string='Estimated Departure'
+    )
+    
+    estimated_arrival = fields.Datetime(
+        string='Estimated Arrival'
+    )
+    
     # Financial
     currency_id = fields.Many2one(
         'res.currency',
@@ -284,40 +400,69 @@ class FreightQuotation(models.Model):
         string='Internal Notes'
     )
 
-    @api.model
-    def create(self, vals):
-        if vals.get('reference', _('New')) == _('New'):
-            vals['reference'] = self.env['ir.sequence'].next_by_code('freight.quotation') or _('New')
-        return super(FreightQuotation, self).create(vals)
+    def unlink(self):
+        self.env['freight.deletion.log'].sudo()._log_deletions(self.cost_line_ids)
+        return super(FreightQuotation, self).unlink()
+
+    def init(self):
+        super().init()
+        tools.create_index(
+            self.env.cr, 'freight_quotation_state_validity_date_idx',
+            self._table, ['state', 'validity_date']
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['freight.port.distance']._fill_estimated_arrival(vals_list)
+        new_vals = [vals for vals in vals_list if vals.get('reference', _('New')) == _('New')]
+        references = self.env['ir.sequence'].next_by_code_block('freight.quotation', len(new_vals))
+        for vals, reference in zip(new_vals, references):
+            vals['reference'] = reference or _('New')
+        return super(FreightQuotation, self).create(vals_list)
 
-    @api.depends('cost_line_ids.amount')
+    @api.onchange('estimated_departure', 'origin_port_id', 'destination_port_id', 'transport_mode')
+    def _onchange_estimated_departure(self):
+        """Pre-fill the estimated arrival from the lane transit time"""
+        if self.estimated_departure:
+            lane = (self.origin_port_id.id, self.destination_port_id.id, self.transport_mode)
+            days = self.env['freight.port.distance']._get_transit_days([lane]).get(lane)
+            if days:
+                self.estimated_arrival = self.estimated_departure + timedelta(days=days)
+
+    @api.depends('currency_id', 'quotation_date', 'cost_line_ids.amount', 'cost_line_ids.cost_type', 'cost_line_ids.currency_id')
     def _compute_total_amount(self):
+        """Sum the sell lines, converted to the quotation currency at the quotation date"""
+        totals = self.env['freight.cost.line']._sum_converted(
+            [
+                ((record.id, 'sell'), line.currency_id.id, line.amount)
+                for record in self for line in record.cost_line_ids if line.cost_type == 'sell'
+            ],
+            {record.id: (record.currency_id, record.quotation_date or fields.Date.today()) for record in self},
+        )
         for record in self:
-            record.total_amount = sum(record.cost_line_ids.mapped('amount'))
+            record.total_amount = totals[record.id, 'sell']
     
-    def _compute_sale_order_count(self):
+    @api.depends('sale_order_id')
+    def _compute_order_count(self):
         for record in self:
-            record.sale_order_count = 1 if record.sale_order_id else 0
+            record.order_count = 1 if record.sale_order_id else 0
     
+    @api.depends('sale_order_id')
     def _compute_invoice_count(self):
+        """Count invoices of all related sale orders with one grouped query"""
+        counts = self.sale_order_id._get_freight_invoice_counts()
         for record in self:
-            if record.sale_order_id:
-                record.invoice_count = len(record.sale_order_id.invoice_ids)
-            else:
-                record.invoice_count = 0
+            record.invoice_count = counts.get(record.sale_order_id.id, 0)
 
     def action_send_quotation(self):
         """Send quotation to customer"""
         self.write({'state': 'sent'})
         return True
 
-    def action_confirm(self):
-        """Confirm quotation and create sale order"""
-        if not self.cost_line_ids:
-            raise ValidationError(_("Cannot confirm quotation without cost lines."))
-        
-        # Create sale order
-        sale_order_vals = {
+    def _prepare_sale_order_vals(self):
+        """Values for the sale order generated from this quotation"""
+        self.ensure_one()
+        return {
             'partner_id': self.customer_id.id,
             'date_order': fields.Datetime.now(),
             'validity_date': self.validity_date,
@@ -325,43 +470,86 @@ class FreightQuotation(models.Model):
             'note': self.terms_conditions,
             'freight_quotation_id': self.id,
         }
-        
-        sale_order = self.env['sale.order'].create(sale_order_vals)
-        
+
+    def _prepare_sale_order_line_vals(self, sale_order):
+        """Values for the sale order lines generated from the sell cost lines
+
+        Prices are converted to the currency of the order, which comes from
+        its pricelist and may differ from the quotation currency.
+        """
+        self.ensure_one()
+        CostLine = self.env['freight.cost.line']
+        date = self.quotation_date or fields.Date.today()
+        return [{
+            'order_id': sale_order.id,
+            'product_id': cost_line.product_id.id,
+            'name': cost_line.description or cost_line.product_id.name,
+            'product_uom_qty': cost_line.quantity,
+            'product_uom': cost_line.product_uom_id.id,
+            'price_unit': CostLine._convert_amount(
+                cost_line.unit_price, cost_line.currency_id, sale_order.currency_id, date
+            ),
+        } for cost_line in self.cost_line_ids if cost_line.cost_type == 'sell']
+
+    def action_confirm(self):
+        """Confirm quotations and create their sale orders
+
+        Works on any number of quotations: all sale orders are created in a
+        single batch, then all of their lines in a second one, so the order
+        totals are recomputed once per order when the batch is flushed.
+        """
+        without_lines = self.filtered(lambda q: not q.cost_line_ids)
+        if without_lines:
+            raise ValidationError(_(
+                "Cannot confirm quotation without cost lines: %s",
+                ', '.join(without_lines.mapped('reference'))
+            ))
+        already_confirmed = self.filtered('sale_order_id')
+        if already_confirmed:
+            raise ValidationError(_(
+                "A sale order already exists for quotation: %s",
+                ', '.join(already_confirmed.mapped('reference'))
+            ))
+
+        # Create sale orders
+        sale_orders = self.env['sale.order'].create([
+            quotation._prepare_sale_order_vals() for quotation in self
+        ])
+
         # Create sale order lines from cost lines
-        for cost_line in self.cost_line_ids.filtered(lambda l: l.cost_type == 'sell'):
-            sale_line_vals = {
-                'order_id': sale_order.id,
-                'product_id': cost_line.product_id.id,
-                'name': cost_line.description or cost_line.product_id.name,
-                'product_uom_qty': cost_line.quantity,
-                'product_uom': cost_line.product_uom_id.id,
-                'price_unit': cost_line.unit_price,
+        sale_line_vals = []
+        for quotation, sale_order in zip(self, sale_orders):
+            sale_line_vals += quotation._prepare_sale_order_line_vals(sale_order)
+        self.env['sale.order.line'].create(sale_line_vals)
+
+        # Update quotations: one batched state write, the orders only go to
+        # the cache and are flushed together in a single UPDATE
+        self.write({'state': 'confirmed'})
+        for quotation, sale_order in zip(self, sale_orders):
+            quotation.sale_order_id = sale_order
+
+        if len(sale_orders) == 1:
+            return {
+                'type': 'ir.actions.act_window',
+                'name': 'Sale Order',
+                'res_model': 'sale.order',
+                'res_id': sale_orders.id,
+                'view_mode': 'form',
+                'target': 'current'
             }
-            self.env['sale.order.line'].create(sale_line_vals)
-        
-        # Update quotation
-        self.write({
-            'state': 'confirmed',
-            'sale_order_id': sale_order.id
-        })
-        
         return {
             'type': 'ir.actions.act_window',
-            'name': 'Sale Order',
+            'name': 'Sale Orders',
             'res_model': 'sale.order',
-            'res_id': sale_order.id,
-            'view_mode': 'form',
+            'domain': [('id', 'in', sale_orders.ids)],
+            'view_mode': 'list,form',
             'target': 'current'
         }
     
-    def action_create_shipment(self):
-        """Create shipment from confirmed quotation"""
-        if self.state != 'confirmed':
-            return False
-            
-        # Create shipment from quotation
-        shipment_vals = {
+    def _prepare_shipment_vals(self):
+        """Values for the shipment generated from this quotation"""
+        self.ensure_one()
+        return {
             'customer_id': self.customer_id.id,
             'origin_port_id': self.origin_port_id.id,
             'destination_port_id': self.destination_port_id.id,
@@ -371,39 +559,162 @@ class FreightQuotation(models.Model):
             'cargo_description': self.cargo_description or 'General Cargo',
             'total_weight': self.estimated_weight,
             'total_volume': self.estimated_volume,
+            'estimated_departure': self.estimated_departure,
+            'estimated_arrival': self.estimated_arrival,
             'quotation_id': self.id,  # Link shipment to quotation
             'state': 'booking'
         }
-        
-        shipment = self.env['freight.shipment'].create(shipment_vals)
-        
+
+    def _prepare_shipment_cost_line_vals(self, shipment):
+        """Values for the shipment cost lines copied from this quotation"""
+        self.ensure_one()
+        return [{
+            'shipment_id': shipment.id,
+            'cost_type': line.cost_type,
+            'product_id': line.product_id.id,
+            'description': line.description,
+            'quantity': line.quantity,
+            'unit_price': line.unit_price,
+            'amount': line.amount,
+            'currency_id': line.currency_id.id,
+            'partner_id': self.customer_id.id if line.cost_type == 'sell' else line.partner_id.id
+        } for line in self.cost_line_ids]
+
+    def action_create_shipment(self):
+        """Create shipments from confirmed quotations
+
+        Quotations that are not confirmed or already have a shipment are
+        skipped. Shipments and their cost lines are created in two batches.
+        """
+        quotations = self.filtered(lambda q: q.state == 'confirmed' and not q.shipment_id)
+        if not quotations:
+            return False
+
+        # Create shipments from quotations, references are reserved in one block
+        shipments = self.env['freight.shipment'].create([
+            quotation._prepare_shipment_vals() for quotation in quotations
+        ])
+
         # Create cost lines from quotation cost lines
-        for line in self.cost_line_ids:
-            self.env['freight.cost.line'].create({
-                'shipment_id': shipment.id,
-                'cost_type': 'sell',
-                'product_id': line.product_id.id,
-                'description': line.description,
-                'quantity': line.quantity,
-                'unit_price': line.unit_price,
-                'amount': line.amount,
-                'partner_id': self.customer_id.id
-            })
-        
-        self.shipment_id = shipment.id
+        cost_line_vals = []
+        for quotation, shipment in zip(quotations, shipments):
+            cost_line_vals += quotation._prepare_shipment_cost_line_vals(shipment)
+        self.env['freight.cost.line'].create(cost_line_vals)
+
+        for quotation, shipment in zip(quotations, shipments):
+            quotation.write({'shipment_id': shipment.id})
+
+        if len(shipments) == 1:
+            return {
+                'type': 'ir.actions.act_window',
+                'name': 'Shipment',
+                'res_model': 'freight.shipment',
+                'res_id': shipments.id,
+                'view_mode': 'form',
+                'target': 'current'
+            }
         return {
             'type': 'ir.actions.act_window',
-            'name': 'Shipment',
+            'name': 'Shipments',
             'res_model': 'freight.shipment',
-            'res_id': shipment.id,
-            'view_mode': 'form',
+            'domain': [('id', 'in', shipments.ids)],
+            'view_mode': 'list,form',
             'target': 'current'
         }
     
+    def action_apply_rate_cards(self):
+        """Price the cost lines of the quotations from the lane rate cards
+
+        The matching cards of all quotations are fetched with one search.
+        Existing lines of a carded service product get its sell or buy rate,
+        written in one batch per distinct price, products without lines get
+        new ones, all created in one batch. Cards without a break for the
+        quotation quantity leave the lines as they are.
+        """
+        CostLine = self.env['freight.cost.line']
+        cards_by_quotation = self.env['freight.rate.card']._find_for_quotations(self)
+        new_line_vals = []
+        line_ids_by_vals = defaultdict(list)
+        for quotation in self:
+            lines = {(line.product_id.id, line.cost_type): line for line in quotation.cost_line_ids}
+            for card in cards_by_quotation.get(quotation.id, []):
+                quantity = card._get_quantity(quotation.estimated_weight, quotation.estimated_volume)
+                rates = card._get_rates(quantity, quotation.currency_id, quotation.quotation_date)
+                if not rates:
+                    continue
+                buy_rate, sell_rate = rates
+                for cost_type, rate in (('sell', sell_rate), ('buy', buy_rate)):
+                    line_vals = {
+                        'quantity': quantity,
+                        'unit_price': rate,
+                        'amount': quantity * rate,
+                    }
+                    line = lines.get((card.product_id.id, cost_type))
+                    if line:
+                        line_ids_by_vals[tuple(sorted(line_vals.items()))].append(line.id)
+                    elif cost_type == 'sell' or rate:
+                        new_line_vals.append(dict(
+                            line_vals,
+                            quotation_id=quotation.id,
+                            cost_type=cost_type,
+                            product_id=card.product_id.id,
+                            description=card.product_id.name,
+                            partner_id=card.vendor_id.id if cost_type == 'buy' else quotation.customer_id.id,
+                        ))
+        for vals, line_ids in line_ids_by_vals.items():
+            CostLine.browse(line_ids).write(dict(vals))
+        CostLine.create(new_line_vals)
+        return True
+
     def action_expire(self):
         """Mark quotation as expired"""
         self.write({'state': 'expired'})
         return True
+
+    @api.model
+    def _cron_expire_quotations(self, batch_size=1000):
+        """Expire draft and sent quotations past their validity date
+
+        Works in chunks of ``batch_size``: each chunk is locked, moved to
+        ``expired`` with one UPDATE, gets its tracking messages logged in
+        batch and is committed. Rows locked by users are skipped and picked
+        up by the next run, and an interrupted run simply resumes with the
+        quotations still pending.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        today = fields.Date.context_today(self)
+        self.flush_model(['state', 'validity_date'])
+        total = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id, state FROM freight_quotation
+                 WHERE state IN ('draft', 'sent') AND validity_date < %s
+                 ORDER BY validity_date, id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, (today, batch_size))
+            initial_states = dict(self.env.cr.fetchall())
+            if not initial_states:
+                break
+            self.env.cr.execute("""
+                UPDATE freight_quotation
+                   SET state = 'expired', write_uid = %s, write_date = (now() at time zone 'UTC')
+                 WHERE id = ANY(%s)
+            """, (self.env.uid, list(initial_states)))
+            quotations = self.browse(list(initial_states))
+            quotations.invalidate_recordset(['state', 'write_uid', 'write_date'])
+            quotations._message_log_tracking_batch(
+                ['state'],
+                {qid: {'state': state} for qid, state in initial_states.items()},
+                {qid: {'state': 'expired'} for qid in initial_states},
+            )
+            total += len(initial_states)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(initial_states) < batch_size:
+                break
+        _logger.info("Expired %s freight quotations", total)
+        return total
     
     def action_reset_to_draft(self):
         """Reset quotation to draft"""
@@ -0,0 +1,280 @@
+import io
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Relative weights of the shipment states, roughly a mature book of business
+STATE_WEIGHTS = {
+    'draft': 5,
+    'quotation': 3,
+    'booking': 6,
+    'documentation': 4,
+    'departure': 3,
+    'in_transit': 10,
+    'arrival': 4,
+    'delivery': 5,
+    'invoiced': 15,
+    'paid': 40,
+    'cancelled': 5,
+}
+
+STATE_ORDER = list(STATE_WEIGHTS)
+
+# transport mode: (weight, service types, transit days range)
+MODE_PROFILES = {
+    'ocean': (60, ['fcl', 'lcl'], (10, 45)),
+    'air': (25, ['air_freight', 'express'], (1, 4)),
+    'land': (15, ['ftl', 'ltl'], (2, 10)),
+}
+
+
+def _copy_value(value):
+    """Format a python value for the COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class FreightDataGenerator(models.AbstractModel):
+    _name = 'freight.data.generator'
+    _description = 'Freight Synthetic Data Generator'
+
+    # ------------------------------------------------------------
+    # Low level helpers
+    # ------------------------------------------------------------
+
+    def _reserve_ids(self, table, count):
+        """Draw ``count`` ids from the table sequence so rows can be linked before COPY"""
+        self.env.cr.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            (table, count)
+        )
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _copy_rows(self, table, columns, rows):
+        """Bulk load ``rows`` into ``table`` with COPY, audit columns are added"""
+        now = self.env.cr.now()
+        uid = self.env.uid
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\t%s\t%s\t%s\t%s\n' % (uid, now, uid, now))
+        buffer.seek(0)
+        self.env.cr._obj.copy_expert(
+            'COPY %s (%s, create_uid, create_date, write_uid, write_date) FROM STDIN' % (
+                table, ', '.join(columns)
+            ),
+            buffer
+        )
+
+    def _commit(self):
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+
+    # ------------------------------------------------------------
+    # Generators
+    # ------------------------------------------------------------
+
+    def _generate_partners(self, rng, count):
+        """Customer and vendor companies, created through the ORM (small volume)"""
+        Partner = self.env['res.partner']
+        partners = Partner.search([('name', '=like', 'Load Test Partner %')], order='id')
+        missing = count - len(partners)
+        if missing > 0:
+            partners |= Partner.create([{
+                'name': 'Load Test Partner %06d' % (len(partners) + i),
+                'is_company': True,
+            } for i in range(missing)])
+        return partners[:count].ids
+
+    def _generate_ports(self, rng, count, country_ids):
+        """Ports with at least one transport mode and plausible coordinates"""
+        ids = self._reserve_ids('freight_port', count)
+        rows = []
+        for port_id in ids:
+            ocean = rng.random() < 0.6
+            air = rng.random() < 0.4
+            land = rng.random() < 0.5 or not (ocean or air)
+            rows.append((
+                port_id, 'GP%07d' % port_id, 'Generated Port %s' % port_id, rng.choice(country_ids),
+                air, ocean, land, True,
+                round(rng.uniform(-60, 70), 7), round(rng.uniform(-180, 180), 7),
+            ))
+        self._copy_rows('freight_port', (
+            'id', 'code', 'name', 'country_id', 'air_supported', 'ocean_supported', 'land_supported',
+            'active', 'latitude', 'longitude',
+        ), rows)
+        return rows
+
+    def _generate_vessels(self, rng, count, country_ids):
+        ids = self._reserve_ids('freight_vessel', count)
+        self._copy_rows('freight_vessel', ('id', 'code', 'name', 'country_id', 'active'), [
+            (vessel_id, 'GV%07d' % vessel_id, 'Generated Vessel %s' % vessel_id, rng.choice(country_ids), True)
+            for vessel_id in ids
+        ])
+        return ids
+
+    def _generate_shipment_batch(self, rng, count, references, ctx):
+        """One batch of shipments with their cost lines, totals computed on the fly"""
+        shipment_ids = self._reserve_ids('freight_shipment', count)
+        lines_per_shipment = [rng.randint(1, 2 * ctx['lines_per_shipment'] - 1) for _i in range(count)]
+        line_ids = iter(self._reserve_ids('freight_cost_line', sum(lines_per_shipment)))
+        span = (ctx['end_date'] - ctx['start_date']).total_seconds()
+        modes = list(ctx['ports_by_mode'])
+        mode_weights = [MODE_PROFILES[mode][0] for mode in modes]
+
+        shipments, lines, messages = [], [], []
+        for shipment_id, reference, line_count in zip(shipment_ids, references, lines_per_shipment):
+            state = rng.choices(STATE_ORDER, ctx['state_weights'])[0]
+            progress = STATE_ORDER.index(state) if state != 'cancelled' else rng.randint(0, 3)
+            mode = rng.choices(modes, mode_weights)[0]
+            _weight, service_types, transit_range = MODE_PROFILES[mode]
+            origin, destination = rng.sample(ctx['ports_by_mode'][mode], 2)
+
+            booked = ctx['start_date'] + timedelta(seconds=rng.random() * span)
+            etd = booked + timedelta(days=rng.randint(2, 21), hours=rng.randint(0, 23))
+            eta = etd + timedelta(days=rng.randint(*transit_range))
+            atd = etd + timedelta(hours=rng.randint(-12, 72)) if progress >= STATE_ORDER.index('departure') else None
+            ata = eta + timedelta(hours=rng.randint(-24, 120)) if progress >= STATE_ORDER.index('arrival') else None
+            delivered = ata + timedelta(days=rng.randint(0, 5)) if progress >= STATE_ORDER.index('delivery') else None
+
+            total_sell = total_buy = 0.0
+            for sequence in range(line_count):
+                cost_type = 'sell' if sequence % 2 == 0 else 'buy'
+                product_id, uom_id = rng.choice(ctx['products'])
+                quantity = float(rng.randint(1, 10))
+                unit_price = round(rng.uniform(50, 2500), 2)
+                amount = round(quantity * unit_price * (1 if cost_type == 'sell' else 0.8), 2)
+                if cost_type == 'sell':
+                    total_sell += amount
+                else:
+                    total_buy += amount
+                lines.append((
+                    next(line_ids), shipment_id, (sequence + 1) * 10, cost_type, product_id, uom_id,
+                    'Generated charge %s' % (sequence + 1), rng.choice(ctx['partner_ids']),
+                    quantity, unit_price, amount, ctx['currency_id'], False,
+                ))
+
+            shipments.append((
+                shipment_id, reference, state, rng.choice(ctx['partner_ids']), origin, destination,
+                mode, rng.choice(('import', 'export')), rng.choice(service_types), 'Generated cargo',
+                round(rng.uniform(10, 25000), 2), round(rng.uniform(0.1, 70), 3), rng.randint(1, 40),
+                rng.choice(ctx['vessel_ids']) if mode == 'ocean' and ctx['vessel_ids'] else None,
+                booked, etd, atd, eta, ata, delivered, ctx['company_id'], ctx['currency_id'],
+                round(total_sell, 2), round(total_buy, 2), round(total_sell - total_buy, 2), True,
+            ))
+            if ctx['tracking']:
+                messages.append((
+                    'freight.shipment', shipment_id, 'notification', ctx['subtype_id'],
+                    '<p>Shipment created by the data generator</p>', ctx['author_id'], booked,
+                ))
+
+        self._copy_rows('freight_shipment', (
+            'id', 'reference', 'state', 'customer_id', 'origin_port_id', 'destination_port_id',
+            'transport_mode', 'direction', 'service_type', 'cargo_description',
+            'total_weight', 'total_volume', 'number_of_packages', 'vessel_id',
+            'booking_date', 'estimated_departure', 'actual_departure', 'estimated_arrival',
+            'actual_arrival', 'delivery_date', 'company_id', 'currency_id',
+            'total_sell_cost', 'total_buy_cost', 'profit_margin', 'active',
+        ), shipments)
+        self._copy_rows('freight_cost_line', (
+            'id', 'shipment_id', 'sequence', 'cost_type', 'product_id', 'product_uom_id',
+            'description', 'partner_id', 'quantity', 'unit_price', 'amount', 'currency_id', 'invoiced',
+        ), lines)
+        if messages:
+            self._copy_rows('mail_message', (
+                'model', 'res_id', 'message_type', 'subtype_id', 'body', 'author_id', 'date',
+            ), messages)
+        return len(shipments), len(lines)
+
+    @api.model
+    def _generate(self, ports=1000, vessels=100, shipments=10000, lines_per_shipment=10,
+                  partners=500, seed=42, tracking=False, batch_size=20000, end_date=None):
+        """Load a deterministic synthetic dataset for capacity planning
+
+        Rows are written with COPY in batches, each batch is committed. The
+        ORM invariants are kept by hand: ids come from the table sequences,
+        references from the shipment sequence in blocks, stored totals are
+        computed while the cost lines are generated and creation messages
+        are only written when ``tracking`` is set. The same ``seed`` and
+        ``end_date`` always produce the same data.
+
+        Generated ports are not added to the port distance matrix, refresh
+        it separately for the lanes of interest.
+        """
+        self.env.flush_all()
+        rng = random.Random(seed)
+        end_date = fields.Datetime.to_datetime(end_date) or fields.Datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        started = time.monotonic()
+
+        country_ids = self.env['res.country'].search([], order='id').ids
+        partner_ids = self._generate_partners(rng, partners)
+        port_rows = self._generate_ports(rng, ports, country_ids) if ports else []
+        vessel_ids = self._generate_vessels(rng, vessels, country_ids) if vessels else []
+        self._commit()
+        _logger.info("Generated %s ports and %s vessels in %.1fs", ports, vessels, time.monotonic() - started)
+
+        ports_by_mode = {'air': [], 'ocean': [], 'land': []}
+        for row in port_rows or self.env['freight.port'].search_read(
+            [], ['air_supported', 'ocean_supported', 'land_supported'], order='id'
+        ):
+            if isinstance(row, dict):
+                port_id, air, ocean, land = row['id'], row['air_supported'], row['ocean_supported'], row['land_supported']
+            else:
+                port_id, air, ocean, land = row[0], row[4], row[5], row[6]
+            for mode, supported in (('air', air), ('ocean', ocean), ('land', land)):
+                if supported:
+                    ports_by_mode[mode].append(port_id)
+        modes = [mode for mode, port_ids in ports_by_mode.items() if len(port_ids) >= 2]
+
+        products = self.env['product.product'].search([('type', '=', 'service')], order='id', limit=50)
+        ctx = {
+            'start_date': end_date - timedelta(days=3 * 365),
+            'end_date': end_date,
+            'lines_per_shipment': max(lines_per_shipment, 1),
+            'state_weights': list(STATE_WEIGHTS.values()),
+            'ports_by_mode': ports_by_mode,
+            'partner_ids': partner_ids,
+            'vessel_ids': vessel_ids,
+            'products': [(product.id, product.uom_id.id) for product in products] or [(None, None)],
+            'company_id': self.env.company.id,
+            'currency_id': self.env.company.currency_id.id,
+            'tracking': tracking,
+            'subtype_id': self.env.ref('mail.mt_note').id,
+            'author_id': self.env.user.partner_id.id,
+        }
+        if shipments and not modes:
+            _logger.warning("No transport mode has two ports, no shipment generated")
+            shipments = 0
+        for mode in set(MODE_PROFILES) - set(modes):
+            del ctx['ports_by_mode'][mode]
+
+        done = line_count = 0
+        while done < shipments:
+            count = min(batch_size, shipments - done)
+            references = self.env['ir.sequence'].next_by_code_block('freight.shipment', count)
+            generated, lines = self._generate_shipment_batch(rng, count, references, ctx)
+            done += generated
+            line_count += lines
+            self._commit()
+            _logger.info("Generated %s/%s shipments, %s cost lines in %.1fs",
+                         done, shipments, line_count, time.monotonic() - started)
+
+        self.env.invalidate_all()
+        return {
+            'ports': ports,
+            'vessels': vessels,
+            'shipments': done,
+            'cost_lines': line_count,
+            'seconds': round(time.monotonic() - started, 1),
+        }
@@ -5,9 +5,10 @@ from odoo.exceptions import ValidationError
 class FreightIncoterm(models.Model):
     _name = 'freight.incoterm'
     _description = 'Freight Incoterms Configuration'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['freight.master.data.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'code'
     _rec_name = 'name'
+    _code_label = 'Incoterm'
 
     code = fields.Char(
         string='Incoterm Code',
@@ -83,13 +84,6 @@ class FreightIncoterm(models.Model):
         help='Additional information about the incoterm'
     )
 
-    @api.constrains('code')
-    def _check_unique_code(self):
-        """Ensure incoterm code is unique"""
-        for record in self:
-            if self.search_count([('code', '=', record.code), ('id', '!=', record.id)]) > 0:
-                raise ValidationError(_('Incoterm code must be unique. Code "%s" already exists.') % record.code)
-
     @api.constrains('code')
     def _check_code_format(self):
         """Validate incoterm code format"""
@@ -99,12 +93,13 @@ class FreightIncoterm(models.Model):
                 if not record.code.isalpha() or len(record.code) < 2 or len(record.code) > 10:
                     raise ValidationError(_('Incoterm code should be 2-10 alphabetic characters.'))
 
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """Override create to ensure code is uppercase"""
-        if 'code' in vals and vals['code']:
-            vals['code'] = vals['code'].upper()
-        return super().create(vals)
+        for vals in vals_list:
+            if 'code' in vals and vals['code']:
+                vals['code'] = vals['code'].upper()
+        return super().create(vals_list)
 
     def write(self, vals):
         """Override write to ensure code is uppercase"""
@@ -112,7 +107,7 @@ class FreightIncoterm(models.Model):
             vals['code'] = vals['code'].upper()
         return super().write(vals)
 
-    def name_get(self):
+    def _name_get_uncached(self):
         """Custom name display: CODE - Description"""
         result = []
         for record in self:
@@ -120,17 +115,6 @@ class FreightIncoterm(models.Model):
             result.append((record.id, name))
         return result
 
-    @api.model
-    def name_search(self, name='', args=None, operator='ilike', limit=100):
-        """Enhanced search by code or description"""
-        args = args or []
-        if name:
-            incoterms = self.search([
-                '|', ('code', operator, name.upper()), ('name', operator, name)
-            ] + args, limit=limit)
-            return incoterms.name_get()
-        return super().name_search(name, args, operator, limit)
-
     @api.model
     def get_default_incoterms(self):
         """Return list of standard Incoterms 2020"""
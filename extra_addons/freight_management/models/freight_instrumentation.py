@@ -0,0 +1,372 @@
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+import psycopg2
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+# System parameter switching the instrumentation on ('1') or off (default)
+INSTRUMENTATION_PARAM = 'freight_management.instrumentation'
+
+# Number of individual calls kept in memory, older ones are dropped
+RING_SIZE = 2000
+
+# Seconds between two writes of the totals of a worker to the database
+FLUSH_INTERVAL = 60
+
+# Methods wrapped on the freight models, compute methods are added from the fields
+INSTRUMENTED_METHODS = ('create', 'write', 'name_search')
+INSTRUMENTED_PREFIXES = ('action_',)
+
+# Per worker process: the last calls, and the totals per (model, method) not
+# yet added to the shared totals in the database
+_lock = threading.Lock()
+_samples = deque(maxlen=RING_SIZE)
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def _record(model_name, method_name, records, queries, sql_time, python_time):
+    with _lock:
+        _samples.append((time.time(), model_name, method_name, records, queries, sql_time, python_time))
+        total = _pending.get((model_name, method_name))
+        if total is None:
+            total = _pending[model_name, method_name] = [0, 0, 0, 0.0, 0.0, 0.0]
+        total[0] += 1
+        total[1] += records
+        total[2] += queries
+        total[3] += sql_time
+        total[4] += python_time
+        total[5] = max(total[5], sql_time + python_time)
+
+
+def _take_pending(force=False):
+    """Pending totals of this worker, emptied, or None when not due yet"""
+    global _last_flush
+    with _lock:
+        now = time.monotonic()
+        if not _pending or (not force and now - _last_flush < FLUSH_INTERVAL):
+            return None
+        _last_flush = now
+        pending = dict(_pending)
+        _pending.clear()
+        return pending
+
+
+def _instrument(model_name, method_name, method):
+    """Wrap ``method`` to record its queries, SQL time and Python time
+
+    Times are inclusive: a create that triggers computes counts the time
+    of those computes too. When instrumentation is disabled the wrapper
+    costs a single cached parameter lookup.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        Instrumentation = self.env['freight.instrumentation']
+        if not Instrumentation._is_enabled():
+            return method(self, *args, **kwargs)
+        thread = threading.current_thread()
+        if not hasattr(thread, 'query_time'):
+            # set by the HTTP layer, missing in crons and shells
+            thread.query_count = 0
+            thread.query_time = 0
+        cr = self.env.cr
+        queries_before = cr.sql_log_count
+        sql_before = thread.query_time
+        start = time.perf_counter()
+        result = None
+        try:
+            result = method(self, *args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            sql_time = thread.query_time - sql_before
+            # create is called on an empty recordset, count what it returns
+            if method_name == 'create':
+                records = len(result) if isinstance(result, models.BaseModel) else 0
+            else:
+                records = len(self)
+            _record(model_name, method_name, records, cr.sql_log_count - queries_before,
+                    sql_time, max(elapsed - sql_time, 0.0))
+            Instrumentation._flush_pending()
+
+    wrapper._freight_instrumented = True
+    return wrapper
+
+
+class FreightInstrumentation(models.AbstractModel):
+    _name = 'freight.instrumentation'
+    _description = 'Freight Method Instrumentation'
+
+    @api.model
+    @tools.ormcache()
+    def _is_enabled(self):
+        param = self.env['ir.config_parameter'].sudo().get_param(INSTRUMENTATION_PARAM)
+        return tools.str2bool(param or '0')
+
+    @api.model
+    def _get_instrumented_models(self):
+        """Freight business models whose hot methods are wrapped"""
+        return [
+            self.env[model_name] for model_name, cls in self.env.registry.items()
+            if model_name.startswith('freight.')
+            and not cls._abstract and not cls._transient
+            and model_name not in ('freight.deletion.log', 'freight.instrumentation.total')
+        ]
+
+    def _register_hook(self):
+        super()._register_hook()
+        for model in self._get_instrumented_models():
+            cls = type(model)
+            method_names = {
+                name for name in dir(cls)
+                if name in INSTRUMENTED_METHODS or name.startswith(INSTRUMENTED_PREFIXES)
+            }
+            method_names.update(
+                field.compute for field in model._fields.values()
+                if isinstance(field.compute, str) and field.model_name == model._name
+            )
+            for name in method_names:
+                method = getattr(cls, name, None)
+                if callable(method) and not getattr(method, '_freight_instrumented', False):
+                    setattr(cls, name, _instrument(model._name, name, method))
+
+    @api.model
+    def _flush_pending(self, force=False):
+        """Add the totals recorded by this worker to the shared totals
+
+        Runs at most every ``FLUSH_INTERVAL`` seconds unless forced, in a
+        cursor of its own so the totals are kept whatever becomes of the
+        current transaction.
+        """
+        pending = _take_pending(force)
+        if not pending:
+            return
+        # same row order in every worker, concurrent flushes cannot deadlock
+        rows = [(model_name, method_name, *values) for (model_name, method_name), values in sorted(pending.items())]
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO freight_instrumentation_total AS t
+                        (model_name, method_name, calls, records, queries, sql_time, python_time, max_time)
+                    SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::int[], %s::int[], %s::int[],
+                                         %s::float8[], %s::float8[], %s::float8[])
+                    ON CONFLICT (model_name, method_name) DO UPDATE SET
+                        calls = t.calls + EXCLUDED.calls,
+                        records = t.records + EXCLUDED.records,
+                        queries = t.queries + EXCLUDED.queries,
+                        sql_time = t.sql_time + EXCLUDED.sql_time,
+                        python_time = t.python_time + EXCLUDED.python_time,
+                        max_time = GREATEST(t.max_time, EXCLUDED.max_time)
+                """, [list(column) for column in zip(*rows)])
+        except psycopg2.Error:
+            _logger.warning("Freight instrumentation: could not save the method totals", exc_info=True)
+
+    @api.model
+    def _get_totals(self):
+        """Totals of all workers, including the calls pending in this one"""
+        self._flush_pending(force=True)
+        self.env.cr.execute("""
+            SELECT model_name, method_name, calls, records, queries, sql_time, python_time, max_time
+              FROM freight_instrumentation_total
+        """)
+        return {(row[0], row[1]): list(row[2:]) for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_samples(self):
+        with _lock:
+            return list(_samples)
+
+    @api.model
+    def _reset(self):
+        with _lock:
+            _samples.clear()
+            _pending.clear()
+        self.env.cr.execute("DELETE FROM freight_instrumentation_total")
+
+    @api.model
+    def _export_prometheus(self):
+        """Totals of all workers in the Prometheus text format"""
+        metrics = [
+            ('freight_method_calls_total', 'counter', 'Number of calls', 0),
+            ('freight_method_records_total', 'counter', 'Number of records processed', 1),
+            ('freight_method_queries_total', 'counter', 'Number of SQL queries', 2),
+            ('freight_method_sql_seconds_total', 'counter', 'Time spent in SQL', 3),
+            ('freight_method_python_seconds_total', 'counter', 'Time spent outside SQL', 4),
+            ('freight_method_max_seconds', 'gauge', 'Slowest call', 5),
+        ]
+        totals = sorted(self._get_totals().items())
+        lines = []
+        for metric, metric_type, help_text, index in metrics:
+            lines.append('# HELP %s %s' % (metric, help_text))
+            lines.append('# TYPE %s %s' % (metric, metric_type))
+            for (model_name, method_name), values in totals:
+                lines.append('%s{model="%s",method="%s"} %s' % (metric, model_name, method_name, values[index]))
+        return '\n'.join(lines) + '\n'
+
+
+class FreightInstrumentationTotal(models.Model):
+    """Method totals of all workers, each worker adds its own periodically"""
+    _name = 'freight.instrumentation.total'
+    _description = 'Freight Method Totals'
+    _log_access = False
+
+    model_name = fields.Char(
+        string='Model',
+        required=True
+    )
+
+    method_name = fields.Char(
+        string='Method',
+        required=True
+    )
+
+    calls = fields.Integer(
+        string='Calls'
+    )
+
+    records = fields.Integer(
+        string='Records'
+    )
+
+    queries = fields.Integer(
+        string='Queries'
+    )
+
+    sql_time = fields.Float(
+        string='SQL Time (s)'
+    )
+
+    python_time = fields.Float(
+        string='Python Time (s)'
+    )
+
+    max_time = fields.Float(
+        string='Max Time (s)'
+    )
+
+    def init(self):
+        super().init()
+        tools.create_unique_index(
+            self.env.cr, 'freight_instrumentation_total_method_uniq', self._table, ['model_name', 'method_name']
+        )
+
+
+class FreightInstrumentationStat(models.TransientModel):
+    _name = 'freight.instrumentation.stat'
+    _description = 'Freight Method Statistics'
+    _order = 'total_time desc'
+
+    model_name = fields.Char(
+        string='Model',
+        readonly=True
+    )
+
+    method_name = fields.Char(
+        string='Method',
+        readonly=True
+    )
+
+    calls = fields.Integer(
+        string='Calls',
+        readonly=True
+    )
+
+    records = fields.Integer(
+        string='Records',
+        readonly=True
+    )
+
+    queries = fields.Integer(
+        string='Queries',
+        readonly=True
+    )
+
+    queries_per_call = fields.Float(
+        string='Queries per Call',
+        readonly=True
+    )
+
+    sql_time = fields.Float(
+        string='SQL Time (s)',
+        digits=(16, 4),
+        readonly=True
+    )
+
+    python_time = fields.Float(
+        string='Python Time (s)',
+        digits=(16, 4),
+        readonly=True
+    )
+
+    total_time = fields.Float(
+        string='Total Time (s)',
+        digits=(16, 4),
+        readonly=True
+    )
+
+    avg_time = fields.Float(
+        string='Average Time (s)',
+        digits=(16, 4),
+        readonly=True
+    )
+
+    max_time = fields.Float(
+        string='Max Time (s)',
+        digits=(16, 4),
+        readonly=True
+    )
+
+    p95_time = fields.Float(
+        string='Recent P95 Time (s)',
+        digits=(16, 4),
+        readonly=True,
+        help='95th percentile over the calls still held in the ring buffer of the serving worker'
+    )
+
+    @api.model
+    def action_open_stats(self):
+        """Snapshot the totals of all workers into a list view"""
+        Instrumentation = self.env['freight.instrumentation']
+        recent = defaultdict(list)
+        for _ts, model_name, method_name, _records, _queries, sql_time, python_time in Instrumentation._get_samples():
+            recent[model_name, method_name].append(sql_time + python_time)
+        p95 = {}
+        for key, durations in recent.items():
+            durations.sort()
+            p95[key] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+        self.search([]).unlink()
+        stats = self.create([{
+            'model_name': model_name,
+            'method_name': method_name,
+            'calls': calls,
+            'records': records,
+            'queries': queries,
+            'queries_per_call': queries / calls,
+            'sql_time': sql_time,
+            'python_time': python_time,
+            'total_time': sql_time + python_time,
+            'avg_time': (sql_time + python_time) / calls,
+            'max_time': max_time,
+            'p95_time': p95.get((model_name, method_name), 0.0),
+        } for (model_name, method_name), (calls, records, queries, sql_time, python_time, max_time)
+            in Instrumentation._get_totals().items()])
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Method Statistics',
+            'res_model': self._name,
+            'view_mode': 'list',
+            'domain': [('id', 'in', stats.ids)],
+            'target': 'current',
+        }
+
+    @api.model
+    def action_reset_stats(self):
+        self.env['freight.instrumentation']._reset()
+        return self.action_open_stats()
@@ -0,0 +1,318 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+WATERMARK_PARAM = 'freight_management.kpi_watermark'
+# Same overlap as the profit report, reprocessing a shipment is idempotent
+WATERMARK_OVERLAP = timedelta(minutes=5)
+# Shipments folded into the snapshot per statement
+REFRESH_BATCH_SIZE = 10000
+
+TRANSPORT_MODES = [
+    ('air', 'Air Freight'),
+    ('ocean', 'Ocean Freight'),
+    ('land', 'Land Freight'),
+]
+
+
+class FreightKpiFact(models.Model):
+    """Contribution of each shipment to the KPI snapshot
+
+    Kept so that a changed shipment can be subtracted from the snapshot
+    before its new values are added. ``shipment_id`` is a plain integer:
+    a cascading foreign key would drop the contribution of a deleted
+    shipment without updating the snapshot.
+    """
+    _name = 'freight.kpi.fact'
+    _description = 'Freight KPI Shipment Contribution'
+    _log_access = False
+
+    shipment_id = fields.Integer(
+        string='Shipment ID',
+        required=True,
+        index=True
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True
+    )
+
+    transport_mode = fields.Selection(
+        TRANSPORT_MODES,
+        string='Transport Mode',
+        required=True
+    )
+
+    state = fields.Char(
+        string='Status',
+        required=True
+    )
+
+    volume = fields.Float(
+        string='Volume (CBM)'
+    )
+
+    weight = fields.Float(
+        string='Weight (KG)'
+    )
+
+    sell_amount = fields.Float(
+        string='Sell Amount'
+    )
+
+    buy_amount = fields.Float(
+        string='Buy Amount'
+    )
+
+    margin = fields.Float(
+        string='Margin'
+    )
+
+    arrived = fields.Boolean(
+        string='Arrived'
+    )
+
+    on_time = fields.Boolean(
+        string='On Time'
+    )
+
+
+class FreightKpiSnapshot(models.Model):
+    _name = 'freight.kpi.snapshot'
+    _description = 'Freight Operations KPI Snapshot'
+    _order = 'company_id, transport_mode, state'
+    _log_access = False
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        readonly=True
+    )
+
+    transport_mode = fields.Selection(
+        TRANSPORT_MODES,
+        string='Transport Mode',
+        required=True,
+        readonly=True
+    )
+
+    state = fields.Selection(
+        selection=lambda self: self.env['freight.shipment']._fields['state'].selection,
+        string='Status',
+        required=True,
+        readonly=True
+    )
+
+    shipment_count = fields.Integer(
+        string='Shipments',
+        readonly=True
+    )
+
+    total_volume = fields.Float(
+        string='Volume (CBM)',
+        readonly=True
+    )
+
+    total_weight = fields.Float(
+        string='Weight (KG)',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        related='company_id.currency_id'
+    )
+
+    sell_amount = fields.Monetary(
+        string='Sell Amount',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    buy_amount = fields.Monetary(
+        string='Buy Amount',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    margin = fields.Monetary(
+        string='Margin',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    arrived_count = fields.Integer(
+        string='Arrived Shipments',
+        readonly=True
+    )
+
+    on_time_count = fields.Integer(
+        string='On-Time Arrivals',
+        readonly=True
+    )
+
+    on_time_rate = fields.Float(
+        string='On-Time %',
+        readonly=True,
+        aggregator='avg',
+        help='Share of arrived shipments that arrived by their estimated arrival'
+    )
+
+    def init(self):
+        super().init()
+        tools.create_unique_index(
+            self.env.cr, 'freight_kpi_snapshot_group_uniq', self._table, ['company_id', 'transport_mode', 'state']
+        )
+
+    def _read_group_select(self, aggregate_spec, query):
+        # The on-time rate of a group is the ratio of its sums, not the
+        # average of the per-row rates
+        if aggregate_spec == 'on_time_rate:avg':
+            return SQL(
+                "100.0 * SUM(%s) / NULLIF(SUM(%s), 0)",
+                self._field_to_sql(self._table, 'on_time_count', query),
+                self._field_to_sql(self._table, 'arrived_count', query),
+            )
+        return super()._read_group_select(aggregate_spec, query)
+
+    @api.model
+    def _apply_shipments(self, shipment_ids):
+        """Replace the contribution of ``shipment_ids`` in the snapshot
+
+        The previous contributions are deleted and the current ones
+        inserted in the same statement, the difference is added to the
+        snapshot rows with one upsert. Deleted or archived shipments only
+        remove their contribution. Amounts are converted to the company
+        currency at the booking date.
+        """
+        shipment_ids = list(shipment_ids)
+        rate_ids, rates = self._get_company_currency_rates(shipment_ids)
+        self.env.cr.execute("""
+            WITH old AS (
+                DELETE FROM freight_kpi_fact
+                 WHERE shipment_id = ANY(%(ids)s)
+             RETURNING company_id, transport_mode, state, -1 AS shipment_count,
+                       -volume AS volume, -weight AS weight, -sell_amount AS sell_amount,
+                       -buy_amount AS buy_amount, -margin AS margin,
+                       -arrived::int AS arrived_count, -on_time::int AS on_time_count
+            ), new AS (
+                INSERT INTO freight_kpi_fact (shipment_id, company_id, transport_mode, state, volume, weight,
+                                              sell_amount, buy_amount, margin, arrived, on_time)
+                SELECT s.id, s.company_id, s.transport_mode, s.state,
+                       COALESCE(s.total_volume, 0), COALESCE(s.total_weight, 0),
+                       COALESCE(s.total_sell_cost, 0) * COALESCE(r.rate, 1.0),
+                       COALESCE(s.total_buy_cost, 0) * COALESCE(r.rate, 1.0),
+                       COALESCE(s.profit_margin, 0) * COALESCE(r.rate, 1.0),
+                       s.actual_arrival IS NOT NULL,
+                       COALESCE(s.actual_arrival <= s.estimated_arrival, FALSE)
+                  FROM freight_shipment s
+             LEFT JOIN unnest(%(rate_ids)s::int[], %(rates)s::float8[]) AS r(shipment_id, rate)
+                    ON r.shipment_id = s.id
+                 WHERE s.id = ANY(%(ids)s) AND s.active AND s.company_id IS NOT NULL
+             RETURNING company_id, transport_mode, state, 1 AS shipment_count,
+                       volume, weight, sell_amount, buy_amount, margin,
+                       arrived::int AS arrived_count, on_time::int AS on_time_count
+            ), delta AS (
+                SELECT company_id, transport_mode, state,
+                       SUM(shipment_count) AS shipment_count, SUM(volume) AS volume, SUM(weight) AS weight,
+                       SUM(sell_amount) AS sell_amount, SUM(buy_amount) AS buy_amount, SUM(margin) AS margin,
+                       SUM(arrived_count) AS arrived_count, SUM(on_time_count) AS on_time_count
+                  FROM (SELECT * FROM old UNION ALL SELECT * FROM new) changes
+              GROUP BY company_id, transport_mode, state
+            )
+            INSERT INTO freight_kpi_snapshot AS k
+                (company_id, transport_mode, state, shipment_count, total_volume, total_weight,
+                 sell_amount, buy_amount, margin, arrived_count, on_time_count, on_time_rate)
+            SELECT company_id, transport_mode, state, shipment_count, volume, weight,
+                   sell_amount, buy_amount, margin, arrived_count, on_time_count,
+                   100.0 * on_time_count / NULLIF(arrived_count, 0)
+              FROM delta
+            ON CONFLICT (company_id, transport_mode, state) DO UPDATE SET
+                shipment_count = k.shipment_count + EXCLUDED.shipment_count,
+                total_volume = k.total_volume + EXCLUDED.total_volume,
+                total_weight = k.total_weight + EXCLUDED.total_weight,
+                sell_amount = k.sell_amount + EXCLUDED.sell_amount,
+                buy_amount = k.buy_amount + EXCLUDED.buy_amount,
+                margin = k.margin + EXCLUDED.margin,
+                arrived_count = k.arrived_count + EXCLUDED.arrived_count,
+                on_time_count = k.on_time_count + EXCLUDED.on_time_count,
+                on_time_rate = 100.0 * (k.on_time_count + EXCLUDED.on_time_count)
+                               / NULLIF(k.arrived_count + EXCLUDED.arrived_count, 0)
+        """, {'ids': shipment_ids, 'rate_ids': rate_ids, 'rates': rates})
+
+    @api.model
+    def _get_company_currency_rates(self, shipment_ids):
+        """Rates converting the totals of shipments to their company currency
+
+        Only shipments in a foreign currency are returned. Rates come from
+        the cursor-level cache of the cost lines, one query per company and
+        booking date missing from it.
+
+        :return: (shipment ids, rates) as parallel lists
+        """
+        self.env.cr.execute("""
+            SELECT s.id, s.company_id, s.currency_id, c.currency_id,
+                   COALESCE(s.booking_date, s.create_date)::date
+              FROM freight_shipment s
+              JOIN res_company c ON c.id = s.company_id
+             WHERE s.id = ANY(%s) AND s.currency_id != c.currency_id
+        """, [shipment_ids])
+        by_company = defaultdict(list)
+        for row in self.env.cr.fetchall():
+            by_company[row[1]].append(row)
+        CostLine = self.env['freight.cost.line']
+        rate_ids, rates = [], []
+        for company_id, rows in by_company.items():
+            company_rates = CostLine._get_currency_rates(
+                {(currency_id, date) for _id, _c, from_id, to_id, date in rows for currency_id in (from_id, to_id)},
+                company=self.env['res.company'].browse(company_id),
+            )
+            for shipment_id, _company_id, from_id, to_id, date in rows:
+                rate_ids.append(shipment_id)
+                rates.append(company_rates[to_id, date] / company_rates[from_id, date])
+        return rate_ids, rates
+
+    @api.model
+    def _refresh(self, since=None):
+        """Fold the shipments changed or deleted after ``since`` into the snapshot
+
+        Without ``since`` the snapshot is rebuilt from every shipment.
+        """
+        self.env.flush_all()
+        if since:
+            self.env.cr.execute("""
+                SELECT id FROM freight_shipment WHERE write_date > %(since)s
+                 UNION
+                SELECT shipment_id FROM freight_cost_line WHERE write_date > %(since)s AND shipment_id IS NOT NULL
+                 UNION
+                SELECT res_id FROM freight_deletion_log WHERE model = 'freight.shipment' AND deleted_at > %(since)s
+            """, {'since': since})
+        else:
+            self.env.cr.execute("TRUNCATE freight_kpi_fact, freight_kpi_snapshot")
+            self.env.cr.execute("SELECT id FROM freight_shipment")
+        shipment_ids = [row[0] for row in self.env.cr.fetchall()]
+        for start in range(0, len(shipment_ids), REFRESH_BATCH_SIZE):
+            self._apply_shipments(shipment_ids[start:start + REFRESH_BATCH_SIZE])
+        self.env.cr.execute("DELETE FROM freight_kpi_snapshot WHERE shipment_count <= 0")
+        self.invalidate_model()
+        return len(shipment_ids)
+
+    @api.model
+    def _cron_refresh(self):
+        """Incrementally refresh the KPI snapshot from the last watermark"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        self.env.cr.execute("SELECT now() at time zone 'UTC'")
+        started_at = self.env.cr.fetchone()[0]
+        watermark = ICP.get_param(WATERMARK_PARAM)
+        since = fields.Datetime.to_datetime(watermark) - WATERMARK_OVERLAP if watermark else None
+        refreshed = self._refresh(since=since)
+        ICP.set_param(WATERMARK_PARAM, fields.Datetime.to_string(started_at))
+        _logger.info("Freight KPI snapshot: %s shipments refreshed", refreshed)
+        return refreshed
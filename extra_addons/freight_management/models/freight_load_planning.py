@@ -0,0 +1,222 @@
+from collections import Counter, namedtuple
+
+from odoo import models, fields, api, Command, _
+from odoo.exceptions import UserError, ValidationError
+
+# One physical package to place, dimensions in meters
+PlanItem = namedtuple('PlanItem', 'package_id length width height weight stackable')
+# A container type the items can be loaded in
+PlanContainer = namedtuple('PlanContainer', 'container_id length width height max_weight cost')
+
+# Compatibility flag of freight.container for each transport mode
+MODE_COMPATIBILITY = {
+    'air': 'air_compatible',
+    'ocean': 'ocean_compatible',
+    'land': 'land_compatible',
+}
+
+
+def pack_container(items, container):
+    """Load ``items`` in one ``container`` with a layer/shelf heuristic
+
+    Items are placed along the length in shelves, shelves side by side
+    across the width and layers stacked in height. Items may turn on their
+    base but are never tipped, and nothing is stacked above a layer holding
+    a non-stackable item.
+
+    :return: tuple (placements [(item, x, y, z, length, width)], items left)
+    """
+    placements, left = [], []
+    x = y = z = 0.0
+    shelf_width = layer_height = weight = 0.0
+    layer_closed = False
+    for item in items:
+        if container.max_weight and weight + item.weight > container.max_weight:
+            left.append(item)
+            continue
+        position = None
+        for length, width in ((item.length, item.width), (item.width, item.length)):
+            if z + item.height > container.height:
+                continue
+            if x + length <= container.length and y + width <= container.width:
+                position = (x, y, z, length, width, 'shelf')
+            elif length <= container.length and y + shelf_width + width <= container.width:
+                position = (0.0, y + shelf_width, z, length, width, 'new_shelf')
+            elif (not layer_closed and length <= container.length and width <= container.width
+                    and z + layer_height + item.height <= container.height):
+                position = (0.0, 0.0, z + layer_height, length, width, 'new_layer')
+            if position:
+                break
+        if not position:
+            left.append(item)
+            continue
+        px, py, pz, length, width, move = position
+        if move == 'new_shelf':
+            y, shelf_width = py, 0.0
+        elif move == 'new_layer':
+            z, y, shelf_width, layer_height = pz, 0.0, 0.0, 0.0
+            layer_closed = False
+        x = px + length
+        shelf_width = max(shelf_width, width)
+        layer_height = max(layer_height, item.height)
+        layer_closed = layer_closed or not item.stackable
+        weight += item.weight
+        placements.append((item, px, py, pz, length, width))
+    return placements, left
+
+
+def plan_load(items, containers):
+    """Choose a container mix for ``items`` and place them
+
+    Stackable items go first, largest first, so non-stackable ones end up
+    in the top layers. Containers are opened one at a time: when one type
+    can take everything left the cheapest such type is used, otherwise the
+    type loading the most volume per unit of cost.
+
+    :return: tuple ([(container, placements)], items that fit nowhere)
+    """
+    remaining = sorted(items, key=lambda i: (not i.stackable, -i.length * i.width * i.height))
+    loads = []
+    while remaining:
+        best = None
+        for container in containers:
+            placements, left = pack_container(remaining, container)
+            if not placements:
+                continue
+            volume = sum(length * width * item.height for item, _x, _y, _z, length, width in placements)
+            key = (not left, -container.cost if not left else volume / container.cost)
+            if best is None or key > best[0]:
+                best = (key, container, placements, left)
+        if best is None:
+            break
+        _key, container, placements, remaining = best
+        loads.append((container, placements))
+    return loads, remaining
+
+
+class FreightShipmentPackage(models.Model):
+    _name = 'freight.shipment.package'
+    _description = 'Freight Shipment Package'
+    _order = 'shipment_id, sequence, id'
+
+    shipment_id = fields.Many2one(
+        'freight.shipment',
+        string='Shipment',
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+    
+    sequence = fields.Integer(
+        string='Sequence',
+        default=10
+    )
+    
+    name = fields.Char(
+        string='Description',
+        required=True
+    )
+    
+    quantity = fields.Integer(
+        string='Quantity',
+        default=1
+    )
+    
+    length = fields.Float(
+        string='Length (m)'
+    )
+    
+    width = fields.Float(
+        string='Width (m)'
+    )
+    
+    height = fields.Float(
+        string='Height (m)'
+    )
+    
+    weight = fields.Float(
+        string='Weight per Package (KG)'
+    )
+    
+    stackable = fields.Boolean(
+        string='Stackable',
+        default=True,
+        help='Other packages may be loaded on top of this one'
+    )
+
+    @api.constrains('quantity', 'length', 'width', 'height')
+    def _check_dimensions(self):
+        for record in self:
+            if record.quantity <= 0:
+                raise ValidationError(_('Package quantity must be positive.'))
+            if record.length <= 0 or record.width <= 0 or record.height <= 0:
+                raise ValidationError(_('Package dimensions must be greater than zero.'))
+
+
+class FreightShipment(models.Model):
+    _inherit = 'freight.shipment'
+
+    package_ids = fields.One2many(
+        'freight.shipment.package',
+        'shipment_id',
+        string='Packages'
+    )
+    
+    load_plan = fields.Json(
+        string='Load Plan',
+        readonly=True,
+        copy=False,
+        help='Containers chosen by the load planner and the position of every package'
+    )
+
+    def _get_plan_containers(self):
+        """Container types usable for this shipment's transport mode"""
+        self.ensure_one()
+        domain = [('is_container', '=', True), ('length', '>', 0), ('width', '>', 0), ('height', '>', 0)]
+        if self.transport_mode in MODE_COMPATIBILITY:
+            domain.append((MODE_COMPATIBILITY[self.transport_mode], '=', True))
+        return [
+            PlanContainer(c.id, c.length, c.width, c.height, c.max_weight, c.daily_rate or c.volume or 1.0)
+            for c in self.env['freight.container'].search(domain)
+        ]
+
+    def action_plan_containers(self):
+        """Compute the container mix and placement from the package lines
+
+        The chosen container types are written to the shipment containers
+        and the placement of every package is kept in the load plan.
+        """
+        for shipment in self:
+            if not shipment.package_ids:
+                raise UserError(_('Shipment %s has no packages to plan.', shipment.reference))
+            containers = shipment._get_plan_containers()
+            if not containers:
+                raise UserError(_('No container type with dimensions is available for this transport mode.'))
+            items = [
+                PlanItem(p.id, p.length, p.width, p.height, p.weight, p.stackable)
+                for p in shipment.package_ids for _i in range(p.quantity)
+            ]
+            loads, unplaced = plan_load(items, containers)
+            if unplaced:
+                raise UserError(_(
+                    '%(count)s package(s) of shipment %(reference)s fit in no available container.',
+                    count=len(unplaced), reference=shipment.reference,
+                ))
+            shipment.write({
+                'container_ids': [Command.set(list({container.container_id for container, _p in loads}))],
+                'load_plan': [{
+                    'container_id': container.container_id,
+                    'placements': [
+                        {'package_id': item.package_id, 'x': x, 'y': y, 'z': z,
+                         'length': length, 'width': width, 'height': item.height}
+                        for item, x, y, z, length, width in placements
+                    ],
+                } for container, placements in loads],
+            })
+            counts = Counter(container.container_id for container, _p in loads)
+            containers = self.env['freight.container'].browse(list(counts))
+            names = {container.id: container.display_name for container in containers}
+            shipment.message_post(body=_(
+                'Load plan: %s', ', '.join(f'{count} x {names[cid]}' for cid, count in counts.items())
+            ))
+        return True
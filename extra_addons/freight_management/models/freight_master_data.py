@@ -0,0 +1,269 @@
+import logging
+import threading
+from collections import Counter
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+from odoo.osv import expression
+from odoo.tools import SQL, escape_psql
+from odoo.tools.lru import LRU
+
+_logger = logging.getLogger(__name__)
+
+# Key of the master data versions read by the current transaction in ``cr.cache``
+MASTER_DATA_VERSIONS = 'freight_master_data_versions'
+# Entries kept per model in each worker
+MASTER_DATA_CACHE_SIZE = 4096
+
+# Per worker: {(dbname, model): (version, LRU {(record id, lang): values})}
+_cache_lock = threading.Lock()
+_master_data_cache = {}
+# Per worker: {(dbname, model): [hits, misses]}
+_master_data_cache_stats = {}
+
+
+class FreightMasterDataVersion(models.Model):
+    """Version of the cached master data of each model
+
+    Bumped in the transaction that changes a cached value, so a worker
+    reading a version always reads the matching data. Versions come from a
+    sequence and are never reused, even after a rollback.
+    """
+    _name = 'freight.master.data.version'
+    _description = 'Freight Master Data Cache Version'
+    _log_access = False
+
+    model = fields.Char(
+        string='Model',
+        required=True
+    )
+
+    version = fields.Integer(
+        string='Version',
+        required=True
+    )
+
+    def init(self):
+        super().init()
+        tools.create_unique_index(self.env.cr, 'freight_master_data_version_model_uniq', self._table, ['model'])
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS freight_master_data_version_seq")
+
+    @api.model
+    def _get_versions(self):
+        """Versions of every model, read once per transaction"""
+        versions = self.env.cr.cache.get(MASTER_DATA_VERSIONS)
+        if versions is None:
+            self.env.cr.execute("SELECT model, version FROM freight_master_data_version")
+            versions = self.env.cr.cache[MASTER_DATA_VERSIONS] = dict(self.env.cr.fetchall())
+        return versions
+
+    @api.model
+    def _bump(self, model_name):
+        self.env.cr.execute("""
+            INSERT INTO freight_master_data_version (model, version)
+            VALUES (%(model)s, nextval('freight_master_data_version_seq'))
+            ON CONFLICT (model) DO UPDATE SET version = nextval('freight_master_data_version_seq')
+         RETURNING version
+        """, {'model': model_name})
+        version = self.env.cr.fetchone()[0]
+        self._get_versions()[model_name] = version
+        return version
+
+
+class FreightMasterDataMixin(models.AbstractModel):
+    _name = 'freight.master.data.mixin'
+    _description = 'Freight Master Data Mixin'
+
+    # Label used in validation messages, e.g. 'Port'
+    _code_label = 'Record'
+    # Code fields matched exactly/by prefix in name_search, best first
+    _name_search_code_fields = ['code']
+    # Scalar fields kept in the worker-local cache next to the display name
+    _master_data_cache_fields = ['code', 'name', 'active']
+    # Fields the display name is built from, related paths included
+    _display_name_depends = ['code', 'name']
+
+    def init(self):
+        """Enforce case-insensitive unique codes with a database index"""
+        super().init()
+        if self._abstract:
+            return
+        indexname = f'{self._table}_code_unique_idx'
+        if tools.index_exists(self.env.cr, indexname):
+            return
+        self.env.cr.execute(SQL(
+            "SELECT lower(code) FROM %s GROUP BY lower(code) HAVING count(*) > 1 LIMIT 1",
+            SQL.identifier(self._table),
+        ))
+        if self.env.cr.fetchone():
+            _logger.warning(
+                "Duplicate codes found in %s, unique index %s not created. "
+                "Fix the duplicates and update the module.", self._table, indexname
+            )
+            return
+        tools.create_unique_index(self.env.cr, indexname, self._table, ['lower(code)'])
+
+    @api.model
+    def _check_code_conflicts(self, codes, exclude_ids=()):
+        """Validate a batch of codes against each other and the database
+
+        All conflicts are collected with a single query and reported in one
+        error, so a bulk import lists every duplicate at once.
+        """
+        keys = [code.lower() for code in codes if code]
+        if not keys:
+            return
+        conflicts = {key for key, count in Counter(keys).items() if count > 1}
+        # Pending code changes must be visible to the query below
+        self.flush_model(['code'])
+        self.env.cr.execute(SQL(
+            "SELECT lower(code) FROM %s WHERE lower(code) = ANY(%s) AND id != ALL(%s)",
+            SQL.identifier(self._table), list(set(keys)), list(exclude_ids),
+        ))
+        conflicts.update(row[0] for row in self.env.cr.fetchall())
+        if conflicts:
+            duplicates = sorted({code for code in codes if code and code.lower() in conflicts})
+            raise ValidationError(_(
+                '%(label)s code must be unique. The following codes already exist: %(codes)s',
+                label=self._code_label,
+                codes=', '.join(f'"{code}"' for code in duplicates),
+            ))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._check_code_conflicts([vals.get('code') for vals in vals_list])
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if vals.get('code'):
+            self._check_code_conflicts([vals['code']] * len(self), exclude_ids=self.ids)
+        res = super().write(vals)
+        cached_fnames = set(self._master_data_cache_fields)
+        cached_fnames.update(path.split('.')[0] for path in self._display_name_depends)
+        if cached_fnames.intersection(vals):
+            self._invalidate_master_data_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_master_data_cache()
+        return res
+
+    @api.model
+    def _get_master_data_cache(self):
+        """Worker-local cache of this model, emptied when its version changes"""
+        version = self.env['freight.master.data.version'].sudo()._get_versions().get(self._name)
+        key = (self.env.cr.dbname, self._name)
+        with _cache_lock:
+            cached_version, cache = _master_data_cache.get(key, (None, None))
+            if cache is None or cached_version != version:
+                cache = LRU(MASTER_DATA_CACHE_SIZE)
+                _master_data_cache[key] = (version, cache)
+        return cache
+
+    @api.model
+    def _invalidate_master_data_cache(self):
+        """Drop the cached values of this model in every worker
+
+        The version is bumped in the current transaction: the other workers
+        drop their cache once it commits, this one right away.
+        """
+        version = self.env['freight.master.data.version'].sudo()._bump(self._name)
+        with _cache_lock:
+            _master_data_cache[self.env.cr.dbname, self._name] = (version, LRU(MASTER_DATA_CACHE_SIZE))
+
+    @api.model
+    def _invalidate_related_master_data(self, fname):
+        """Drop the caches of the models displaying ``fname`` of a related record"""
+        for model_name in self.env.registry['freight.master.data.mixin']._inherit_children:
+            Model = self.env[model_name]
+            if not Model._abstract and any(path.startswith(fname + '.') for path in Model._display_name_depends):
+                Model._invalidate_master_data_cache()
+
+    @api.model
+    def _get_master_data(self, record_id):
+        """Cached codes, capability flags and display name of a record
+
+        Kept per worker and model, and dropped everywhere when a cached
+        value of the model changes. The returned dict is shared between
+        callers and must not be modified.
+        """
+        cache = self._get_master_data_cache()
+        key = (record_id, self.env.lang)
+        stats = _master_data_cache_stats.setdefault((self.env.cr.dbname, self._name), [0, 0])
+        values = cache.get(key)
+        if values is not None:
+            stats[0] += 1
+            return values
+        stats[1] += 1
+        record = self.sudo().browse(record_id)
+        if not record.exists():
+            return {}
+        values = {fname: record[fname] for fname in self._master_data_cache_fields}
+        values['display_name'] = record._name_get_uncached()[0][1]
+        cache[key] = values
+        return values
+
+    @api.model
+    def get_master_data_cache_stats(self):
+        """Hit/miss counters of the master data cache in this worker, per model"""
+        return {
+            model_name: {'hit': hits, 'miss': misses}
+            for (dbname, model_name), (hits, misses) in _master_data_cache_stats.items()
+            if dbname == self.env.cr.dbname
+        }
+
+    @api.depends(lambda self: self._display_name_depends)
+    @api.depends_context('lang')
+    def _compute_display_name(self):
+        for record in self:
+            if record.id:
+                record.display_name = self._get_master_data(record.id).get('display_name', False)
+            else:
+                record.display_name = record._name_get_uncached()[0][1]
+
+    @api.model
+    def _name_search_ranked(self, name, domain, limit=100):
+        """Search by code or name, best matches first
+
+        Runs increasingly broad searches and stops as soon as ``limit`` is
+        reached: exact code, then code or name prefix, then substring. Every
+        stage is served by the trigram indexes on code and name, and typical
+        autocomplete input is answered by the first one or two stages.
+        """
+        pattern = escape_psql(name)
+        code_fields = self._name_search_code_fields
+        stages = [
+            [(fname, '=ilike', pattern) for fname in code_fields],
+            [(fname, '=ilike', pattern + '%') for fname in code_fields + ['name']],
+            [(fname, 'ilike', name) for fname in code_fields + ['name']],
+        ]
+        records = self.browse()
+        for leaves in stages:
+            remaining = limit - len(records) if limit else None
+            if remaining is not None and remaining <= 0:
+                break
+            stage_domain = ['|'] * (len(leaves) - 1) + leaves
+            records |= self.search(
+                stage_domain + domain + [('id', 'not in', records.ids)], limit=remaining
+            )
+        return records
+
+    @api.model
+    def _search_display_name(self, operator, value):
+        """Match the code fields as well as the name"""
+        if not isinstance(value, str) or operator not in ('ilike', 'not ilike', '=ilike', 'like', '=like', '='):
+            return super()._search_display_name(operator, value)
+        fnames = self._name_search_code_fields + ['name']
+        leaves = [[(fname, operator, value)] for fname in fnames]
+        if operator in expression.NEGATIVE_TERM_OPERATORS:
+            return expression.AND(leaves)
+        return expression.OR(leaves)
+
+    @api.model
+    def name_search(self, name='', domain=None, operator='ilike', limit=100):
+        """Ranked search by code or name"""
+        if name and operator == 'ilike':
+            records = self._name_search_ranked(name, domain or [], limit=limit)
+            return [(record.id, record.display_name) for record in records.sudo()]
+        return super().name_search(name, domain, operator, limit)
@@ -1,25 +1,33 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+# Fields that change the lanes of the port distance matrix
+DISTANCE_FIELDS = ('latitude', 'longitude', 'active', 'air_supported', 'ocean_supported', 'land_supported')
+
 
 class FreightPort(models.Model):
     _name = 'freight.port'
     _description = 'Freight Port Configuration'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['freight.master.data.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'name'
     _rec_name = 'name'
+    _code_label = 'Port'
+    _master_data_cache_fields = ['code', 'name', 'active', 'air_supported', 'ocean_supported', 'land_supported']
+    _display_name_depends = ['code', 'name', 'country_id.name']
 
     code = fields.Char(
         string='Port Code',
         required=True,
         size=10,
         tracking=True,
+        index='trigram',
         help='Unique port identification code'
     )
     name = fields.Char(
         string='Port Name',
         required=True,
         tracking=True,
+        index='trigram',
         help='Full name of the port'
     )
     country_id = fields.Many2one(
@@ -84,19 +92,19 @@ class FreightPort(models.Model):
         help='Additional information about the port'
     )
 
+    def write(self, vals):
+        res = super().write(vals)
+        if any(fname in vals for fname in DISTANCE_FIELDS):
+            # Lanes are recomputed by the lane cron, not here
+            self.env['freight.port.distance']._invalidate_ports(self)
+        return res
+
     @api.model
     def _get_timezone_selection(self):
         """Get timezone selection list"""
         import pytz
         return [(tz, tz) for tz in pytz.all_timezones]
 
-    @api.constrains('code')
-    def _check_unique_code(self):
-        """Ensure port code is unique"""
-        for record in self:
-            if self.search_count([('code', '=', record.code), ('id', '!=', record.id)]) > 0:
-                raise ValidationError(_('Port code must be unique. Code "%s" already exists.') % record.code)
-
     @api.constrains('air_supported', 'ocean_supported', 'land_supported')
     def _check_transport_mode(self):
         """Ensure at least one transport mode is supported"""
@@ -110,7 +118,7 @@ class FreightPort(models.Model):
         if self.country_id:
             self.state_id = False
 
-    def name_get(self):
+    def _name_get_uncached(self):
         """Custom name display: [CODE] Name, Country"""
         result = []
         for record in self:
@@ -119,15 +127,3 @@ class FreightPort(models.Model):
                 name += f", {record.country_id.name}"
             result.append((record.id, name))
         return result
-
-    @api.model
-    def name_search(self, name='', args=None, operator='ilike', limit=100):
-        """Enhanced search by code or name"""
-        args = args or []
-        if name:
-            # Search by code or name
-            ports = self.search([
-                '|', ('code', operator, name), ('name', operator, name)
-            ] + args, limit=limit)
-            return ports.name_get()
-        return super().name_search(name, args, operator, limit)
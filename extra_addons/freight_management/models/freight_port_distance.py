@@ -0,0 +1,311 @@
+import logging
+import math
+import threading
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+from .freight_port import DISTANCE_FIELDS
+
+_logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# Port flag telling whether a port supports each transport mode
+MODE_FIELDS = {
+    'air': 'air_supported',
+    'ocean': 'ocean_supported',
+    'land': 'land_supported',
+}
+# Average door-to-door speed (km/day) and fixed handling time (days) used
+# until a lane has enough shipment history
+TRANSIT_SPEED = {'air': 8000.0, 'ocean': 550.0, 'land': 500.0}
+HANDLING_DAYS = {'air': 1.0, 'ocean': 3.0, 'land': 1.0}
+# Completed shipments needed before a lane uses its own average transit time
+MIN_HISTORY = 3
+# Lanes written per statement
+LANE_BATCH_SIZE = 10000
+# Quotations and shipments changed this recently get their missing lanes
+# computed by the lane cron
+LANE_LOOKBACK = timedelta(days=2)
+
+
+class FreightPortDistance(models.Model):
+    _name = 'freight.port.distance'
+    _description = 'Freight Port Distance and Transit Time'
+    _log_access = False
+
+    origin_port_id = fields.Many2one(
+        'freight.port',
+        string='Origin Port',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    destination_port_id = fields.Many2one(
+        'freight.port',
+        string='Destination Port',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    transport_mode = fields.Selection([
+        ('air', 'Air Freight'),
+        ('ocean', 'Ocean Freight'),
+        ('land', 'Land Freight')
+    ], string='Transport Mode', required=True)
+    
+    distance_km = fields.Float(
+        string='Distance (km)'
+    )
+    
+    transit_days = fields.Float(
+        string='Transit Time (days)'
+    )
+    
+    history_count = fields.Integer(
+        string='Completed Shipments',
+        help='Number of completed shipments the transit time is averaged from'
+    )
+
+    needs_refresh = fields.Boolean(
+        string='Needs Refresh',
+        help='Set when a port of the lane changed, the lane is recomputed by the cron'
+    )
+
+    def init(self):
+        super().init()
+        tools.create_unique_index(
+            self.env.cr, 'freight_port_distance_lane_uniq', self._table,
+            ['origin_port_id', 'destination_port_id', 'transport_mode'],
+        )
+        tools.create_index(
+            self.env.cr, 'freight_port_distance_destination_idx', self._table, ['destination_port_id']
+        )
+        tools.create_index(
+            self.env.cr, 'freight_port_distance_needs_refresh_idx', self._table, ['id'], where='needs_refresh'
+        )
+
+    @api.model
+    def _great_circle(self, lat1, lon1, lat2, lon2):
+        """Haversine distance (km) between two points given in degrees"""
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+    @api.model
+    def _compute_lanes(self, lanes):
+        """Compute and store the (origin id, destination id, mode) ``lanes``
+
+        Only lanes used by quotations and shipments are stored, never the
+        full port matrix. Called by the crons only, lookups never write. Lanes whose ports are inactive, lack coordinates
+        or do not support the mode are removed instead. Lanes with enough
+        shipment history keep their historical transit time.
+
+        :return: {lane: transit days} of the stored lanes
+        """
+        lanes = list(lanes)
+        if not lanes:
+            return {}
+        self.env['freight.port'].flush_model(DISTANCE_FIELDS)
+        self.env.cr.execute("""
+            SELECT id, latitude, longitude, air_supported, ocean_supported, land_supported
+              FROM freight_port
+             WHERE id = ANY(%s) AND active AND (latitude != 0 OR longitude != 0)
+        """, [list({port_id for lane in lanes for port_id in lane[:2]})])
+        ports = {row['id']: row for row in self.env.cr.dictfetchall()}
+
+        valid, invalid = [], []
+        for origin_id, destination_id, mode in lanes:
+            origin, destination = ports.get(origin_id), ports.get(destination_id)
+            if (origin_id != destination_id and origin and destination
+                    and origin[MODE_FIELDS[mode]] and destination[MODE_FIELDS[mode]]):
+                distance = self._great_circle(
+                    origin['latitude'], origin['longitude'], destination['latitude'], destination['longitude']
+                )
+                transit = HANDLING_DAYS[mode] + distance / TRANSIT_SPEED[mode]
+                valid.append((origin_id, destination_id, mode, distance, transit))
+            else:
+                invalid.append((origin_id, destination_id, mode))
+
+        result = {}
+        for start in range(0, len(valid), LANE_BATCH_SIZE):
+            origin_ids, destination_ids, modes, distances, transits = zip(*valid[start:start + LANE_BATCH_SIZE])
+            self.env.cr.execute("""
+                INSERT INTO freight_port_distance AS d
+                    (origin_port_id, destination_port_id, transport_mode, distance_km, transit_days,
+                     history_count, needs_refresh)
+                SELECT origin_id, destination_id, mode, distance, transit, 0, FALSE
+                  FROM unnest(%s::int[], %s::int[], %s::varchar[], %s::float8[], %s::float8[])
+                       AS v(origin_id, destination_id, mode, distance, transit)
+                ON CONFLICT (origin_port_id, destination_port_id, transport_mode) DO UPDATE SET
+                    distance_km = EXCLUDED.distance_km,
+                    transit_days = CASE WHEN d.history_count >= %s THEN d.transit_days ELSE EXCLUDED.transit_days END,
+                    needs_refresh = FALSE
+             RETURNING origin_port_id, destination_port_id, transport_mode, transit_days
+            """, [list(origin_ids), list(destination_ids), list(modes), list(distances), list(transits), MIN_HISTORY])
+            for origin, destination, mode, days in self.env.cr.fetchall():
+                result[origin, destination, mode] = days
+        for start in range(0, len(invalid), LANE_BATCH_SIZE):
+            self.env.cr.execute("""
+                DELETE FROM freight_port_distance
+                 WHERE (origin_port_id, destination_port_id, transport_mode) IN %s
+            """, [tuple(invalid[start:start + LANE_BATCH_SIZE])])
+        self.invalidate_model()
+        return result
+
+    @api.model
+    def _invalidate_ports(self, ports):
+        """Flag the stored lanes of ``ports`` for recomputation
+
+        Called when port coordinates, capabilities or activity change: the
+        lanes are recomputed by the lane cron.
+        """
+        if not ports:
+            return
+        self.env.cr.execute("""
+            UPDATE freight_port_distance
+               SET needs_refresh = TRUE
+             WHERE (origin_port_id = ANY(%s) OR destination_port_id = ANY(%s)) AND NOT needs_refresh
+        """, [ports.ids, ports.ids])
+        self.invalidate_model(['needs_refresh'])
+
+    @api.model
+    def _refresh_flagged(self):
+        """Recompute the flagged lanes by chunks, each committed"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        refreshed = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT origin_port_id, destination_port_id, transport_mode
+                  FROM freight_port_distance
+                 WHERE needs_refresh
+                 LIMIT %s
+            """, [LANE_BATCH_SIZE])
+            lanes = self.env.cr.fetchall()
+            if not lanes:
+                break
+            self._compute_lanes(lanes)
+            refreshed += len(lanes)
+            if auto_commit:
+                self.env.cr.commit()
+        return refreshed
+
+    @api.model
+    def _compute_missing_lanes(self):
+        """Compute the lanes of recent quotations and shipments not stored yet"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        route_fnames = ['origin_port_id', 'destination_port_id', 'transport_mode']
+        self.env['freight.shipment'].flush_model(route_fnames)
+        self.env['freight.quotation'].flush_model(route_fnames)
+        self.env.cr.execute("""
+            SELECT l.origin_port_id, l.destination_port_id, l.transport_mode
+              FROM (
+                    SELECT origin_port_id, destination_port_id, transport_mode
+                      FROM freight_shipment
+                     WHERE write_date > %(since)s
+                     UNION
+                    SELECT origin_port_id, destination_port_id, transport_mode
+                      FROM freight_quotation
+                     WHERE write_date > %(since)s
+                   ) l
+             WHERE l.origin_port_id IS NOT NULL AND l.destination_port_id IS NOT NULL
+               AND l.transport_mode IS NOT NULL
+               AND NOT EXISTS (
+                    SELECT 1 FROM freight_port_distance d
+                     WHERE d.origin_port_id = l.origin_port_id
+                       AND d.destination_port_id = l.destination_port_id
+                       AND d.transport_mode = l.transport_mode
+               )
+        """, {'since': fields.Datetime.now() - LANE_LOOKBACK})
+        lanes = self.env.cr.fetchall()
+        for start in range(0, len(lanes), LANE_BATCH_SIZE):
+            self._compute_lanes(lanes[start:start + LANE_BATCH_SIZE])
+            if auto_commit:
+                self.env.cr.commit()
+        return len(lanes)
+
+    @api.model
+    def _refresh_transit_history(self):
+        """Use the average transit time of completed shipments per lane
+
+        Lanes shipped on but never looked up are computed first.
+        """
+        self.env['freight.shipment'].flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT s.origin_port_id, s.destination_port_id, s.transport_mode
+              FROM freight_shipment s
+             WHERE s.actual_departure IS NOT NULL AND s.actual_arrival > s.actual_departure
+               AND s.origin_port_id IS NOT NULL AND s.destination_port_id IS NOT NULL
+               AND s.transport_mode IS NOT NULL
+               AND NOT EXISTS (
+                    SELECT 1 FROM freight_port_distance d
+                     WHERE d.origin_port_id = s.origin_port_id
+                       AND d.destination_port_id = s.destination_port_id
+                       AND d.transport_mode = s.transport_mode
+               )
+        """)
+        self._compute_lanes(self.env.cr.fetchall())
+        self.env.cr.execute("""
+            UPDATE freight_port_distance d
+               SET transit_days = CASE WHEN h.count >= %s THEN h.days ELSE d.transit_days END,
+                   history_count = h.count
+              FROM (
+                    SELECT origin_port_id, destination_port_id, transport_mode, COUNT(*) AS count,
+                           AVG(EXTRACT(EPOCH FROM actual_arrival - actual_departure) / 86400) AS days
+                      FROM freight_shipment
+                     WHERE actual_departure IS NOT NULL AND actual_arrival > actual_departure
+                  GROUP BY origin_port_id, destination_port_id, transport_mode
+                   ) h
+             WHERE d.origin_port_id = h.origin_port_id
+               AND d.destination_port_id = h.destination_port_id
+               AND d.transport_mode = h.transport_mode
+        """, (MIN_HISTORY,))
+        self.invalidate_model()
+
+    @api.model
+    def _cron_compute_lanes(self):
+        """Recompute the flagged lanes and compute the missing recent ones"""
+        refreshed = self._refresh_flagged()
+        computed = self._compute_missing_lanes()
+        _logger.info("Freight port distances: %s flagged lanes recomputed, %s new lanes", refreshed, computed)
+
+    @api.model
+    def _cron_refresh(self):
+        self._cron_compute_lanes()
+        self._refresh_transit_history()
+
+    @api.model
+    def _get_transit_days(self, lanes):
+        """Transit days of many (origin id, destination id, mode) lanes at once
+
+        A single read of the stored lanes, safe in onchanges: nothing is
+        computed or written at request time. Lanes not stored yet have no
+        transit time until the lane cron computes them, lanes flagged after
+        a port change keep their previous value until then.
+        """
+        lanes = {lane for lane in lanes if all(lane)}
+        if not lanes:
+            return {}
+        self.env.cr.execute("""
+            SELECT origin_port_id, destination_port_id, transport_mode, transit_days
+              FROM freight_port_distance
+             WHERE (origin_port_id, destination_port_id, transport_mode) IN %s
+        """, (tuple(lanes),))
+        return {(origin, destination, mode): days for origin, destination, mode, days in self.env.cr.fetchall()}
+
+    @api.model
+    def _fill_estimated_arrival(self, vals_list):
+        """Set the missing estimated_arrival of creation values from their lane"""
+        to_fill = [
+            vals for vals in vals_list
+            if vals.get('estimated_departure') and not vals.get('estimated_arrival')
+        ]
+        def lane_of(vals):
+            return vals.get('origin_port_id'), vals.get('destination_port_id'), vals.get('transport_mode')
+
+        transit = self._get_transit_days(lane_of(vals) for vals in to_fill)
+        for vals in to_fill:
+            days = transit.get(lane_of(vals))
+            if days:
+                departure = fields.Datetime.to_datetime(vals['estimated_departure'])
+                vals['estimated_arrival'] = departure + timedelta(days=days)
@@ -0,0 +1,223 @@
+from collections import defaultdict
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+
+
+class FreightRateCard(models.Model):
+    _name = 'freight.rate.card'
+    _description = 'Freight Lane Rate Card'
+    _inherit = ['mail.thread']
+    _order = 'origin_port_id, destination_port_id, date_from desc'
+
+    name = fields.Char(
+        string='Name',
+        required=True,
+        tracking=True
+    )
+    
+    active = fields.Boolean(
+        string='Active',
+        default=True
+    )
+    
+    # Lane
+    origin_port_id = fields.Many2one(
+        'freight.port',
+        string='Origin Port',
+        required=True,
+        tracking=True
+    )
+    
+    destination_port_id = fields.Many2one(
+        'freight.port',
+        string='Destination Port',
+        required=True,
+        tracking=True
+    )
+    
+    transport_mode = fields.Selection([
+        ('air', 'Air Freight'),
+        ('ocean', 'Ocean Freight'),
+        ('land', 'Land Freight')
+    ], string='Transport Mode', required=True, tracking=True)
+    
+    service_type = fields.Selection([
+        ('fcl', 'Full Container Load (FCL)'),
+        ('lcl', 'Less than Container Load (LCL)'),
+        ('ftl', 'Full Truck Load (FTL)'),
+        ('ltl', 'Less than Truck Load (LTL)'),
+        ('air_freight', 'Air Freight'),
+        ('express', 'Express Service')
+    ], string='Service Type', tracking=True, help='Leave empty to apply to any service type')
+    
+    container_id = fields.Many2one(
+        'freight.container',
+        string='Container Type',
+        tracking=True,
+        help='Leave empty to apply to any container type'
+    )
+    
+    # Validity
+    date_from = fields.Date(
+        string='Valid From',
+        required=True,
+        default=fields.Date.today,
+        tracking=True
+    )
+    
+    date_to = fields.Date(
+        string='Valid Until',
+        tracking=True
+    )
+    
+    # Pricing
+    product_id = fields.Many2one(
+        'product.product',
+        string='Service Product',
+        required=True,
+        domain=[('type', '=', 'service')],
+        tracking=True
+    )
+    
+    vendor_id = fields.Many2one(
+        'res.partner',
+        string='Vendor',
+        tracking=True,
+        help='Carrier or agent charging the buy rate'
+    )
+    
+    rate_basis = fields.Selection([
+        ('weight', 'Per KG'),
+        ('volume', 'Per CBM'),
+        ('unit', 'Per Shipment')
+    ], string='Rate Basis', required=True, default='unit', tracking=True)
+    
+    currency_id = fields.Many2one(
+        'res.currency',
+        string='Currency',
+        default=lambda self: self.env.company.currency_id
+    )
+    
+    break_ids = fields.One2many(
+        'freight.rate.card.break',
+        'rate_card_id',
+        string='Rate Breaks',
+        copy=True
+    )
+
+    def init(self):
+        super().init()
+        tools.create_index(
+            self.env.cr, 'freight_rate_card_lane_idx', self._table,
+            ['origin_port_id', 'destination_port_id', 'transport_mode', 'date_from', 'date_to'],
+        )
+
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        for record in self:
+            if record.date_to and record.date_to < record.date_from:
+                raise ValidationError(_('The end of validity must be after its start.'))
+
+    def _get_quantity(self, weight, volume):
+        """Quantity the rates of this card apply to"""
+        self.ensure_one()
+        if self.rate_basis == 'weight':
+            return weight
+        if self.rate_basis == 'volume':
+            return volume
+        return 1.0
+
+    def _get_rates(self, quantity, currency=None, date=None):
+        """Buy and sell unit rates of the break matching ``quantity``
+
+        Breaks are minimum quantities, the highest one reached applies. The
+        rates are converted from the card currency to ``currency`` at
+        ``date`` when given.
+
+        :return: tuple (buy rate, sell rate), None when no break is reached
+        """
+        self.ensure_one()
+        applicable = self.break_ids.filtered(lambda b: b.min_quantity <= quantity)
+        rate_break = applicable.sorted('min_quantity')[-1:]
+        if not rate_break:
+            return None
+        rates = (rate_break.buy_rate, rate_break.sell_rate)
+        if currency and self.currency_id and self.currency_id != currency:
+            date = date or fields.Date.context_today(self)
+            rates = tuple(self.currency_id._convert(rate, currency, self.env.company, date) for rate in rates)
+        return rates
+
+    @api.model
+    def _find_for_quotations(self, quotations):
+        """Matching rate cards of many quotations with one search
+
+        :return: dict {quotation id: rate cards}, the most specific card
+            per service product (service type and container set) first
+        """
+        if not quotations:
+            return {}
+        dates = quotations.mapped('quotation_date')
+        cards = self.search([
+            ('origin_port_id', 'in', quotations.origin_port_id.ids),
+            ('destination_port_id', 'in', quotations.destination_port_id.ids),
+            ('transport_mode', 'in', list(set(quotations.mapped('transport_mode')))),
+            ('date_from', '<=', max(dates)),
+            '|', ('date_to', '=', False), ('date_to', '>=', min(dates)),
+        ])
+        cards.break_ids.mapped('min_quantity')  # prefetch all breaks at once
+        by_lane = defaultdict(list)
+        for card in cards:
+            by_lane[card.origin_port_id.id, card.destination_port_id.id, card.transport_mode].append(card)
+
+        result = {}
+        for quotation in quotations:
+            matches = {}
+            lane = (quotation.origin_port_id.id, quotation.destination_port_id.id, quotation.transport_mode)
+            for card in by_lane.get(lane, []):
+                if card.date_from > quotation.quotation_date or (card.date_to and card.date_to < quotation.quotation_date):
+                    continue
+                if card.service_type and card.service_type != quotation.service_type:
+                    continue
+                if card.container_id and card.container_id != quotation.container_id:
+                    continue
+                specificity = bool(card.service_type) + bool(card.container_id)
+                best = matches.get(card.product_id.id)
+                if not best or specificity > best[0]:
+                    matches[card.product_id.id] = (specificity, card)
+            result[quotation.id] = self.browse([card.id for _spec, card in matches.values()])
+        return result
+
+
+class FreightRateCardBreak(models.Model):
+    _name = 'freight.rate.card.break'
+    _description = 'Freight Rate Card Break'
+    _order = 'rate_card_id, min_quantity'
+
+    rate_card_id = fields.Many2one(
+        'freight.rate.card',
+        string='Rate Card',
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+    
+    min_quantity = fields.Float(
+        string='From Quantity',
+        default=0.0,
+        help='Weight (KG), volume (CBM) or units from which these rates apply'
+    )
+    
+    currency_id = fields.Many2one(
+        related='rate_card_id.currency_id'
+    )
+    
+    buy_rate = fields.Monetary(
+        string='Buy Rate',
+        currency_field='currency_id'
+    )
+    
+    sell_rate = fields.Monetary(
+        string='Sell Rate',
+        currency_field='currency_id'
+    )
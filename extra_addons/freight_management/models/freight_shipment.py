@@ -1,12 +1,65 @@
-from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 
+# Allowed shipment state transitions. Each entry lists the states it can be
+# applied from, the resulting state, the datetime field stamped with the
+# transition time and an optional guard method. Guards are called on the
+# candidate records and return a dict {record id: error message}.
+SHIPMENT_TRANSITIONS = {
+    'confirm_booking': {
+        'from': ('draft', 'quotation'),
+        'to': 'booking',
+    },
+    'prepare_documentation': {
+        'from': ('booking',),
+        'to': 'documentation',
+    },
+    'departure': {
+        'from': ('documentation',),
+        'to': 'departure',
+        'stamp': 'actual_departure',
+    },
+    'in_transit': {
+        'from': ('departure',),
+        'to': 'in_transit',
+    },
+    'arrival': {
+        'from': ('in_transit',),
+        'to': 'arrival',
+        'stamp': 'actual_arrival',
+    },
+    'delivery': {
+        'from': ('arrival',),
+        'to': 'delivery',
+        'stamp': 'delivery_date',
+    },
+    'invoice': {
+        'from': ('delivery',),
+        'to': 'invoiced',
+    },
+    'pay': {
+        'from': ('invoiced',),
+        'to': 'paid',
+    },
+    'cancel': {
+        'from': ('draft', 'quotation', 'booking', 'documentation', 'departure', 'in_transit', 'arrival'),
+        'to': 'cancelled',
+        'guard': '_guard_not_invoiced',
+    },
+    'reset_to_draft': {
+        'from': ('cancelled',),
+        'to': 'draft',
+    },
+}
+
+
 class FreightShipment(models.Model):
     _name = 'freight.shipment'
     _description = 'Freight Shipment'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['freight.bulk.tracking.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'create_date desc'
     _rec_name = 'reference'
 
@@ -19,6 +72,13 @@ class FreightShipment(models.Model):
         default=lambda self: _('New'),
         tracking=True
     )
+
+    import_ref = fields.Char(
+        string='Import Reference',
+        copy=False,
+        readonly=True,
+        help='Reference of the shipment in the file it was imported from'
+    )
     
     state = fields.Selection([
         ('draft', 'Draft'),
@@ -147,6 +207,7 @@ class FreightShipment(models.Model):
     
     voyage_flight_number = fields.Char(
         string='Voyage/Flight Number',
+        index=True,
         tracking=True
     )
 
@@ -190,6 +251,14 @@ class FreightShipment(models.Model):
     )
 
     # Financial Fields
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        index=True,
+        default=lambda self: self.env.company
+    )
+    
     currency_id = fields.Many2one(
         'res.currency',
         string='Currency',
@@ -255,11 +324,47 @@ class FreightShipment(models.Model):
         compute='_compute_transit_days'
     )
 
-    @api.model
-    def create(self, vals):
-        if vals.get('reference', _('New')) == _('New'):
-            vals['reference'] = self.env['ir.sequence'].next_by_code('freight.shipment') or _('New')
-        return super(FreightShipment, self).create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['freight.port.distance']._fill_estimated_arrival(vals_list)
+        new_vals = [vals for vals in vals_list if vals.get('reference', _('New')) == _('New')]
+        references = self.env['ir.sequence'].next_by_code_block('freight.shipment', len(new_vals))
+        for vals, reference in zip(new_vals, references):
+            vals['reference'] = reference or _('New')
+        return super(FreightShipment, self).create(vals_list)
+
+    def init(self):
+        super().init()
+        # Keyset pagination of the change data export
+        tools.create_index(self.env.cr, 'freight_shipment_write_date_id_idx', self._table, ['write_date', 'id'])
+        # A file row is imported once, see freight.shipment.import
+        tools.create_unique_index(self.env.cr, 'freight_shipment_import_ref_uniq', self._table, ['import_ref'])
+
+    def unlink(self):
+        DeletionLog = self.env['freight.deletion.log'].sudo()
+        DeletionLog._log_deletions(self)
+        DeletionLog._log_deletions(self.cost_line_ids)
+        return super(FreightShipment, self).unlink()
+
+    def write(self, vals):
+        """Write, optionally logging tracking in bulk
+
+        With ``freight_bulk_tracking`` in the context (mass update wizard,
+        imports, API calls) the regular per-record tracking is disabled and
+        the changes are logged afterwards as one consolidated message per
+        record, all messages and tracking values being inserted in batch.
+        """
+        context = self.env.context
+        if not context.get('freight_bulk_tracking') or context.get('mail_notrack') or context.get('tracking_disable'):
+            return super(FreightShipment, self).write(vals)
+        tracked_fnames = [fname for fname in self._track_get_fields() if fname in vals]
+        initial_values = {
+            record.id: {fname: record[fname] for fname in tracked_fnames} for record in self
+        }
+        res = super(FreightShipment, self.with_context(mail_notrack=True)).write(vals)
+        if tracked_fnames:
+            self._message_log_tracking_batch(tracked_fnames, initial_values)
+        return res
 
     @api.depends('actual_departure', 'actual_arrival')
     def _compute_transit_days(self):
@@ -270,15 +375,64 @@ class FreightShipment(models.Model):
             else:
                 record.days_in_transit = 0
 
-    @api.depends('cost_line_ids')
+    @api.depends(
+        'currency_id', 'booking_date',
+        'cost_line_ids', 'cost_line_ids.amount', 'cost_line_ids.cost_type', 'cost_line_ids.currency_id',
+    )
     def _compute_total_costs(self):
+        """Compute sell/buy totals for the whole batch with one grouped query
+
+        Saved shipments are aggregated in the database so the number of
+        queries does not depend on the number of shipments or cost lines;
+        the currency and conversion date of each shipment come from the same
+        query. Unsaved records (onchange) are summed from the cache. Lines
+        in another currency are converted at the booking date, the rates
+        being fetched once per currency and date for the whole batch.
+        """
+        amounts = []
+        targets = {}
+        stored = self.filtered('id')
+        if stored:
+            self.env['freight.cost.line'].flush_model(['shipment_id', 'cost_type', 'currency_id', 'amount'])
+            stored.flush_recordset(['currency_id', 'booking_date'])
+            self.env.cr.execute("""
+                SELECT l.shipment_id, l.cost_type, l.currency_id, SUM(l.amount),
+                       s.currency_id, COALESCE(s.booking_date, s.create_date)
+                  FROM freight_cost_line l
+                  JOIN freight_shipment s ON s.id = l.shipment_id
+                 WHERE l.shipment_id = ANY(%s)
+              GROUP BY l.shipment_id, l.cost_type, l.currency_id, s.currency_id, s.booking_date, s.create_date
+            """, [stored.ids])
+            Currency = self.env['res.currency']
+            for shipment_id, cost_type, currency_id, amount, to_currency_id, date in self.env.cr.fetchall():
+                amounts.append(((shipment_id, cost_type), currency_id, amount or 0.0))
+                targets[shipment_id] = (Currency.browse(to_currency_id), (date or fields.Datetime.now()).date())
+        for record in self - stored:
+            targets[record.id] = (record.currency_id, record._get_conversion_date())
+            for line in record.cost_line_ids:
+                amounts.append(((record.id, line.cost_type), line.currency_id.id, line.amount))
+        totals = self.env['freight.cost.line']._sum_converted(amounts, targets)
         for record in self:
-            sell_costs = sum(record.cost_line_ids.filtered(lambda x: x.cost_type == 'sell').mapped('amount'))
-            buy_costs = sum(record.cost_line_ids.filtered(lambda x: x.cost_type == 'buy').mapped('amount'))
+            sell_costs = totals[record.id, 'sell']
+            buy_costs = totals[record.id, 'buy']
             record.total_sell_cost = sell_costs
             record.total_buy_cost = buy_costs
             record.profit_margin = sell_costs - buy_costs
 
+    def _get_conversion_date(self):
+        """Date at which the cost lines are converted to the shipment currency"""
+        self.ensure_one()
+        return (self.booking_date or self.create_date or fields.Datetime.now()).date()
+
+    @api.onchange('estimated_departure', 'origin_port_id', 'destination_port_id', 'transport_mode')
+    def _onchange_estimated_departure(self):
+        """Pre-fill the estimated arrival from the lane transit time"""
+        if self.estimated_departure:
+            lane = (self.origin_port_id.id, self.destination_port_id.id, self.transport_mode)
+            days = self.env['freight.port.distance']._get_transit_days([lane]).get(lane)
+            if days:
+                self.estimated_arrival = self.estimated_departure + timedelta(days=days)
+
     @api.constrains('origin_port_id', 'destination_port_id')
     def _check_ports(self):
         for record in self:
@@ -287,85 +441,151 @@ class FreightShipment(models.Model):
 
     @api.constrains('transport_mode', 'origin_port_id', 'destination_port_id')
     def _check_port_transport_compatibility(self):
+        # Port capabilities come from the master data cache, not a port read
+        Port = self.env['freight.port']
         for record in self:
+            origin = Port._get_master_data(record.origin_port_id.id)
+            destination = Port._get_master_data(record.destination_port_id.id)
             if record.transport_mode == 'air':
-                if not record.origin_port_id.air_supported or not record.destination_port_id.air_supported:
+                if not origin.get('air_supported') or not destination.get('air_supported'):
                     raise ValidationError(_('Selected ports must support air transport for air freight.'))
             elif record.transport_mode == 'ocean':
-                if not record.origin_port_id.ocean_supported or not record.destination_port_id.ocean_supported:
+                if not origin.get('ocean_supported') or not destination.get('ocean_supported'):
                     raise ValidationError(_('Selected ports must support ocean transport for ocean freight.'))
             elif record.transport_mode == 'land':
-                if not record.origin_port_id.land_supported or not record.destination_port_id.land_supported:
+                if not origin.get('land_supported') or not destination.get('land_supported'):
                     raise ValidationError(_('Selected ports must support land transport for land freight.'))
 
+    def _guard_not_invoiced(self):
+        """Shipments with invoiced cost lines cannot be cancelled"""
+        return {
+            record.id: _('Shipment %s has invoiced cost lines.', record.reference)
+            for record in self if any(record.cost_line_ids.mapped('invoiced'))
+        }
+
+    def _execute_transition(self, name, raise_on_failure=False):
+        """Apply a state transition to the whole recordset
+
+        Records whose current state does not allow the transition, or that
+        fail its guard, are reported instead of aborting the batch. All the
+        other records are moved with one grouped write.
+
+        :return: tuple (done records, {record id: error message})
+        """
+        transition = SHIPMENT_TRANSITIONS[name]
+        state_labels = dict(self._fields['state']._description_selection(self.env))
+        failures = {}
+        candidates = self.browse()
+        for state, records in self.grouped('state').items():
+            if state in transition['from']:
+                candidates |= records
+                continue
+            for record in records:
+                failures[record.id] = _(
+                    'Shipment %(reference)s cannot go from %(source)s to %(target)s.',
+                    reference=record.reference,
+                    source=state_labels.get(state),
+                    target=state_labels.get(transition['to']),
+                )
+        if candidates and transition.get('guard'):
+            failures.update(getattr(candidates, transition['guard'])())
+        if failures and raise_on_failure:
+            raise UserError('\n'.join(failures.values()))
+
+        done = candidates.filtered(lambda r: r.id not in failures)
+        if done:
+            vals = {'state': transition['to']}
+            if transition.get('stamp'):
+                vals[transition['stamp']] = fields.Datetime.now()
+            done.write(vals)
+        return done, failures
+
+    def action_bulk_transition(self, target_state):
+        """Move shipments to ``target_state`` from whatever state they are in
+
+        The recordset is partitioned by current state, each partition uses
+        the transition leading from its state to the target, and every
+        transition is applied as one grouped write.
+
+        :return: dict with the ``done`` ids and the ``failed`` {id: message}
+        """
+        by_transition = defaultdict(lambda: self.browse())
+        failures = {}
+        for state, records in self.grouped('state').items():
+            name = next((
+                name for name, transition in SHIPMENT_TRANSITIONS.items()
+                if transition['to'] == target_state and state in transition['from']
+            ), None)
+            if name:
+                by_transition[name] |= records
+            else:
+                failures.update({
+                    record.id: _('Shipment %s cannot be moved to this status.', record.reference)
+                    for record in records
+                })
+        done = self.browse()
+        for name, records in by_transition.items():
+            transition_done, transition_failures = records._execute_transition(name)
+            done |= transition_done
+            failures.update(transition_failures)
+        return {'done': done.ids, 'failed': failures}
+
     def action_confirm_booking(self):
         """Confirm the shipment booking"""
-        self.write({'state': 'booking'})
+        self._execute_transition('confirm_booking', raise_on_failure=True)
         return True
 
     def action_prepare_documentation(self):
         """Move to documentation stage"""
-        self.write({'state': 'documentation'})
+        self._execute_transition('prepare_documentation', raise_on_failure=True)
         return True
 
     def action_departure(self):
         """Mark shipment as departed"""
-        self.write({
-            'state': 'departure',
-            'actual_departure': fields.Datetime.now()
-        })
+        self._execute_transition('departure', raise_on_failure=True)
         return True
 
     def action_in_transit(self):
         """Mark shipment as in transit"""
-        self.write({'state': 'in_transit'})
+        self._execute_transition('in_transit', raise_on_failure=True)
         return True
 
     def action_arrival(self):
         """Mark shipment as arrived"""
-        self.write({
-            'state': 'arrival',
-            'actual_arrival': fields.Datetime.now()
-        })
+        self._execute_transition('arrival', raise_on_failure=True)
         return True
 
     def action_delivery(self):
         """Mark shipment as delivered"""
-        self.write({
-            'state': 'delivery',
-            'delivery_date': fields.Datetime.now()
-        })
+        self._execute_transition('delivery', raise_on_failure=True)
         return True
 
     def action_cancel(self):
         """Cancel the shipment"""
-        self.write({'state': 'cancelled'})
+        self._execute_transition('cancel', raise_on_failure=True)
         return True
 
     def action_reset_to_draft(self):
         """Reset shipment to draft"""
-        self.write({'state': 'draft'})
+        self._execute_transition('reset_to_draft', raise_on_failure=True)
         return True
     
     @api.depends('quotation_id.sale_order_id')
     def _compute_sale_order_count(self):
         """Compute the number of sale orders related to this shipment"""
         for record in self:
-            if record.quotation_id and record.quotation_id.sale_order_id:
-                record.sale_order_count = 1
-            else:
-                record.sale_order_count = 0
+            record.sale_order_count = 1 if record.quotation_id.sale_order_id else 0
     
     @api.depends('quotation_id.sale_order_id')
     def _compute_invoice_count(self):
-        """Compute the number of invoices related to this shipment"""
+        """Compute the number of invoices related to this shipment
+
+        The quotations and sale orders of the whole batch are prefetched
+        together and their invoices are counted with one grouped query.
+        """
+        counts = self.quotation_id.sale_order_id._get_freight_invoice_counts(move_types=('out_invoice',))
         for record in self:
-            if record.quotation_id and record.quotation_id.sale_order_id:
-                # Count invoices from the related sale order
-                sale_order = record.quotation_id.sale_order_id
-                record.invoice_count = len(sale_order.invoice_ids.filtered(lambda inv: inv.move_type == 'out_invoice'))
-            else:
-                record.invoice_count = 0
+            record.invoice_count = counts.get(record.quotation_id.sale_order_id.id, 0)
     
     def action_view_sale_order(self):
         """View related sale order through quotation"""
@@ -0,0 +1,490 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+
+_logger = logging.getLogger(__name__)
+
+EVENT_CODES = [
+    ('booked', 'Booking Confirmed'),
+    ('gate_in', 'Gate In'),
+    ('loaded', 'Loaded'),
+    ('departed', 'Departed'),
+    ('transshipment', 'Transshipment'),
+    ('arrived', 'Arrived'),
+    ('discharged', 'Discharged'),
+    ('customs_released', 'Customs Released'),
+    ('gate_out', 'Gate Out'),
+    ('delivered', 'Delivered'),
+    ('exception', 'Exception'),
+]
+
+# Shipment dates a carrier update may set
+CARRIER_DATE_FIELDS = ('estimated_departure', 'estimated_arrival', 'actual_departure', 'actual_arrival')
+
+# Milestone timestamps kept on the shipment status, by event code
+MILESTONE_COLUMNS = {
+    'departed': 'departed_at',
+    'arrived': 'arrived_at',
+    'delivered': 'delivered_at',
+}
+
+
+class FreightShipmentEvent(models.Model):
+    _name = 'freight.shipment.event'
+    _description = 'Freight Shipment Milestone Event'
+    _order = 'event_time desc, id desc'
+
+    shipment_id = fields.Many2one(
+        'freight.shipment',
+        string='Shipment',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    event_code = fields.Selection(
+        EVENT_CODES,
+        string='Milestone',
+        required=True
+    )
+
+    event_time = fields.Datetime(
+        string='Event Time',
+        required=True
+    )
+
+    location = fields.Char(
+        string='Location'
+    )
+
+    description = fields.Char(
+        string='Description'
+    )
+
+    source = fields.Char(
+        string='Source',
+        help='Carrier or feed that reported the event'
+    )
+
+    external_id = fields.Char(
+        string='External ID',
+        help='Identifier of the event in the source feed, used to ignore duplicates'
+    )
+
+    def init(self):
+        super().init()
+        # Events arrive roughly in time order, a BRIN index stays tiny
+        # while still pruning time range scans on a very large table.
+        tools.create_index(
+            self.env.cr, 'freight_shipment_event_time_brin', self._table, ['event_time'], method='brin',
+        )
+        tools.create_unique_index(
+            self.env.cr, 'freight_shipment_event_external_uniq', self._table,
+            ['source', 'external_id'],
+        )
+
+    def write(self, vals):
+        raise UserError(_('Shipment events are append-only and cannot be modified.'))
+
+    @api.model
+    def _parse_event_time(self, value):
+        """Naive UTC datetime from an ISO 8601 string (with or without offset)"""
+        if not value or isinstance(value, datetime):
+            return value or None
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    @api.model
+    def _ingest(self, events):
+        """Append a batch of carrier events and update the shipment status
+
+        ``events`` are dicts with ``event_code``, ``event_time`` and either
+        ``shipment_id`` or ``shipment_reference``, plus optional
+        ``location``, ``description``, ``source`` and ``external_id``.
+        Events already received (same source and external id) are ignored.
+
+        Events are inserted in one statement and the latest status of every
+        touched shipment is upserted in a second one, in its own table.
+        Shipment rows are only key-share locked by the foreign keys, so
+        ingest does not wait on users editing shipments. Returns the number of inserted and duplicate
+        events and the events that could not be matched.
+        """
+        self.check_access('create')
+        if not events:
+            return {'inserted': 0, 'duplicates': 0, 'rejected': []}
+
+        references = {event['shipment_reference'] for event in events if event.get('shipment_reference')}
+        shipment_by_reference = {}
+        if references:
+            shipment_by_reference = {
+                shipment['reference']: shipment['id']
+                for shipment in self.env['freight.shipment'].search_read(
+                    [('reference', 'in', list(references))], ['reference']
+                )
+            }
+        shipment_ids = {event['shipment_id'] for event in events if event.get('shipment_id')}
+        existing_ids = set(self.env['freight.shipment'].browse(shipment_ids).exists().ids)
+
+        codes = dict(EVENT_CODES)
+        rows, rejected = [], []
+        for index, event in enumerate(events):
+            shipment_id = event.get('shipment_id') or shipment_by_reference.get(event.get('shipment_reference'))
+            if event.get('shipment_id') and shipment_id not in existing_ids:
+                shipment_id = False
+            event_time = self._parse_event_time(event.get('event_time'))
+            if not shipment_id:
+                rejected.append({'index': index, 'error': _('Unknown shipment')})
+            elif event.get('event_code') not in codes:
+                rejected.append({'index': index, 'error': _('Unknown event code %s', event.get('event_code'))})
+            elif not event_time:
+                rejected.append({'index': index, 'error': _('Invalid event time')})
+            else:
+                rows.append((
+                    shipment_id, event['event_code'], event_time, event.get('location'),
+                    event.get('description'), event.get('source'), event.get('external_id'),
+                ))
+        if not rows:
+            return {'inserted': 0, 'duplicates': 0, 'rejected': rejected}
+
+        self.env.cr.execute("""
+            INSERT INTO freight_shipment_event
+                (shipment_id, event_code, event_time, location, description, source, external_id,
+                 create_uid, write_uid, create_date, write_date)
+            SELECT v.shipment_id, v.event_code, v.event_time, v.location, v.description, v.source,
+                   v.external_id, %s, %s, NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC'
+              FROM unnest(%s::int[], %s::varchar[], %s::timestamp[], %s::varchar[], %s::varchar[],
+                          %s::varchar[], %s::varchar[])
+                   AS v(shipment_id, event_code, event_time, location, description, source, external_id)
+            ON CONFLICT (source, external_id) DO NOTHING
+            RETURNING id, shipment_id, event_code, event_time, location
+        """, [self.env.uid, self.env.uid] + [list(column) for column in zip(*rows)])
+        inserted = self.env.cr.fetchall()
+
+        self.env['freight.shipment.status']._upsert_from_events(inserted)
+        self.invalidate_model()
+        return {'inserted': len(inserted), 'duplicates': len(rows) - len(inserted), 'rejected': rejected}
+
+
+class FreightShipmentStatus(models.Model):
+    _name = 'freight.shipment.status'
+    _description = 'Freight Shipment Latest Milestone'
+    _log_access = False
+    _rec_name = 'shipment_id'
+
+    shipment_id = fields.Many2one(
+        'freight.shipment',
+        string='Shipment',
+        required=True,
+        ondelete='cascade'
+    )
+
+    event_id = fields.Many2one(
+        'freight.shipment.event',
+        string='Latest Event',
+        ondelete='set null'
+    )
+
+    event_code = fields.Selection(
+        EVENT_CODES,
+        string='Latest Milestone'
+    )
+
+    event_time = fields.Datetime(
+        string='Latest Event Time'
+    )
+
+    location = fields.Char(
+        string='Latest Location'
+    )
+
+    departed_at = fields.Datetime(
+        string='Departed At'
+    )
+
+    arrived_at = fields.Datetime(
+        string='Arrived At'
+    )
+
+    delivered_at = fields.Datetime(
+        string='Delivered At'
+    )
+
+    def init(self):
+        super().init()
+        tools.create_unique_index(self.env.cr, 'freight_shipment_status_shipment_uniq', self._table, ['shipment_id'])
+
+    @api.model
+    def _upsert_from_events(self, events):
+        """Fold (id, shipment_id, event_code, event_time, location) rows into the status
+
+        The latest event per shipment is computed in Python, then every
+        shipment is upserted with a single statement. An older event never
+        replaces a newer one, milestone timestamps keep the latest value.
+        """
+        latest = {}
+        milestones = {}
+        for event_id, shipment_id, event_code, event_time, location in events:
+            current = latest.get(shipment_id)
+            if current is None or (event_time, event_id) > (current[2], current[0]):
+                latest[shipment_id] = (event_id, event_code, event_time, location)
+            column = MILESTONE_COLUMNS.get(event_code)
+            if column:
+                stamps = milestones.setdefault(shipment_id, {})
+                stamps[column] = max(stamps.get(column) or event_time, event_time)
+        if not latest:
+            return
+        rows = [(
+            shipment_id, event_id, event_code, event_time, location,
+            milestones.get(shipment_id, {}).get('departed_at'),
+            milestones.get(shipment_id, {}).get('arrived_at'),
+            milestones.get(shipment_id, {}).get('delivered_at'),
+        ) for shipment_id, (event_id, event_code, event_time, location) in latest.items()]
+        self.env.cr.execute("""
+            INSERT INTO freight_shipment_status AS s
+                (shipment_id, event_id, event_code, event_time, location, departed_at, arrived_at, delivered_at)
+            SELECT * FROM unnest(%s::int[], %s::int[], %s::varchar[], %s::timestamp[], %s::varchar[],
+                                 %s::timestamp[], %s::timestamp[], %s::timestamp[])
+            ON CONFLICT (shipment_id) DO UPDATE SET
+                event_id = CASE WHEN s.event_time > EXCLUDED.event_time THEN s.event_id ELSE EXCLUDED.event_id END,
+                event_code = CASE WHEN s.event_time > EXCLUDED.event_time THEN s.event_code ELSE EXCLUDED.event_code END,
+                location = CASE WHEN s.event_time > EXCLUDED.event_time THEN s.location ELSE EXCLUDED.location END,
+                event_time = GREATEST(s.event_time, EXCLUDED.event_time),
+                departed_at = GREATEST(s.departed_at, EXCLUDED.departed_at),
+                arrived_at = GREATEST(s.arrived_at, EXCLUDED.arrived_at),
+                delivered_at = GREATEST(s.delivered_at, EXCLUDED.delivered_at)
+        """, [list(column) for column in zip(*rows)])
+        self.invalidate_model()
+        _logger.debug("Freight shipment status: %s shipments updated", len(rows))
+
+
+class FreightShipment(models.Model):
+    _inherit = 'freight.shipment'
+
+    event_ids = fields.One2many(
+        'freight.shipment.event',
+        'shipment_id',
+        string='Milestone Events'
+    )
+
+    event_count = fields.Integer(
+        string='Event Count',
+        compute='_compute_milestone_status'
+    )
+
+    last_event_code = fields.Selection(
+        EVENT_CODES,
+        string='Latest Milestone',
+        compute='_compute_milestone_status'
+    )
+
+    last_event_time = fields.Datetime(
+        string='Latest Event Time',
+        compute='_compute_milestone_status'
+    )
+
+    last_event_location = fields.Char(
+        string='Latest Location',
+        compute='_compute_milestone_status'
+    )
+
+    carrier_departed_at = fields.Datetime(
+        string='Carrier Departure',
+        compute='_compute_milestone_status',
+        help='Departure time reported by the carrier feed'
+    )
+
+    carrier_arrived_at = fields.Datetime(
+        string='Carrier Arrival',
+        compute='_compute_milestone_status',
+        help='Arrival time reported by the carrier feed'
+    )
+
+    def _compute_milestone_status(self):
+        """Read the latest milestone of the whole batch from the status table"""
+        statuses = {
+            status['shipment_id'][0]: status
+            for status in self.env['freight.shipment.status'].search_read(
+                [('shipment_id', 'in', self.ids)],
+                ['shipment_id', 'event_code', 'event_time', 'location', 'departed_at', 'arrived_at'],
+            )
+        }
+        counts = dict(self.env['freight.shipment.event']._read_group(
+            [('shipment_id', 'in', self.ids)], ['shipment_id'], ['__count'],
+        ))
+        for record in self:
+            status = statuses.get(record.id, {})
+            record.event_count = counts.get(record, 0)
+            record.last_event_code = status.get('event_code', False)
+            record.last_event_time = status.get('event_time', False)
+            record.last_event_location = status.get('location', False)
+            record.carrier_departed_at = status.get('departed_at', False)
+            record.carrier_arrived_at = status.get('arrived_at', False)
+
+    @api.model
+    def _apply_carrier_updates(self, updates):
+        """Apply a batch of carrier status and ETA updates
+
+        Each update identifies shipments by ``reference`` or by
+        ``voyage_number`` (every open shipment on that voyage or flight) and
+        may carry ``estimated_departure``, ``estimated_arrival``,
+        ``actual_departure``, ``actual_arrival``, a ``vessel`` code, a
+        ``flight`` number and a ``milestone`` event (with ``event_time``,
+        ``location``, ``source`` and ``external_id``).
+
+        All references, voyages and vessels are resolved with one query
+        each. The values are merged per shipment in the order of the
+        updates, then shipments receiving the same values are written
+        together and milestones go to the event store in one ingest, all in
+        one savepoint. If that fails, the updates are applied one by one so
+        only the failing ones are reported, each update's dates and
+        milestone being applied or rejected together. Tracking is logged
+        once for the whole batch. Returns one result per update, in order.
+        """
+        Event = self.env['freight.shipment.event']
+        results = [{'index': index, 'status': 'ok', 'shipments': []} for index in range(len(updates))]
+
+        references = {u['reference'] for u in updates if u.get('reference')}
+        voyages = {u['voyage_number'] for u in updates if u.get('voyage_number')}
+        domain = []
+        if references:
+            domain = [('reference', 'in', list(references))]
+        if voyages:
+            voyage_domain = [
+                ('voyage_flight_number', 'in', list(voyages)),
+                ('state', 'not in', ('delivery', 'invoiced', 'paid', 'cancelled')),
+            ]
+            domain = ['|'] + domain + ['&'] + voyage_domain if domain else voyage_domain
+        by_reference, by_voyage = {}, defaultdict(list)
+        for shipment in self.search_read(domain, ['reference', 'voyage_flight_number', 'state']) if domain else []:
+            by_reference[shipment['reference']] = shipment['id']
+            if shipment['state'] not in ('delivery', 'invoiced', 'paid', 'cancelled'):
+                by_voyage[shipment['voyage_flight_number']].append(shipment['id'])
+
+        vessel_codes = {u['vessel'] for u in updates if u.get('vessel')}
+        vessels = {
+            vessel['code']: vessel['id']
+            for vessel in self.env['freight.vessel'].search_read([('code', 'in', list(vessel_codes))], ['code'])
+        } if vessel_codes else {}
+
+        codes = dict(EVENT_CODES)
+        prepared = {}
+        for index, update in enumerate(updates):
+            result = results[index]
+            if update.get('reference'):
+                shipment_ids = [by_reference[update['reference']]] if update['reference'] in by_reference else []
+            else:
+                shipment_ids = by_voyage.get(update.get('voyage_number'), [])
+            if not shipment_ids:
+                result.update(status='error', error=_('No shipment matches this update.'))
+                continue
+            vals = {}
+            for fname in CARRIER_DATE_FIELDS:
+                if update.get(fname):
+                    value = Event._parse_event_time(update[fname])
+                    if not value:
+                        result.update(status='error', error=_('Invalid date for %s.', fname))
+                        break
+                    vals[fname] = value
+            if result['status'] == 'error':
+                continue
+            if update.get('vessel'):
+                if update['vessel'] not in vessels:
+                    result.update(status='error', error=_('Unknown vessel %s.', update['vessel']))
+                    continue
+                vals['vessel_id'] = vessels[update['vessel']]
+            if update.get('flight'):
+                vals['voyage_flight_number'] = update['flight']
+            # Milestones are checked before anything is applied, an update
+            # is applied whole or not at all
+            events = []
+            if update.get('milestone'):
+                if update['milestone'] not in codes:
+                    result.update(status='error', error=_('Unknown event code %s', update['milestone']))
+                    continue
+                if update.get('event_time') and not Event._parse_event_time(update['event_time']):
+                    result.update(status='error', error=_('Invalid event time'))
+                    continue
+                for shipment_id in shipment_ids:
+                    events.append({
+                        'shipment_id': shipment_id,
+                        'event_code': update['milestone'],
+                        'event_time': update.get('event_time') or fields.Datetime.now(),
+                        'location': update.get('location'),
+                        'description': update.get('description'),
+                        'source': update.get('source'),
+                        # one event per shipment of a voyage update
+                        'external_id': update.get('external_id') and (
+                            update['external_id'] if len(shipment_ids) == 1
+                            else '%s/%s' % (update['external_id'], shipment_id)
+                        ),
+                    })
+            prepared[index] = (shipment_ids, vals, events)
+
+        # Tracking of all the writes is logged once, from the values read up front
+        shipment_ids = {shipment_id for ids, _vals, _events in prepared.values() for shipment_id in ids}
+        shipments = self.browse(sorted(shipment_ids))
+        written_fnames = {fname for _ids, vals, _events in prepared.values() for fname in vals}
+        tracked_fnames = [fname for fname in self._track_get_fields() if fname in written_fnames]
+        initial_values = {
+            shipment.id: {fname: shipment[fname] for fname in tracked_fnames} for shipment in shipments
+        }
+
+        failures = {}
+        try:
+            with self.env.cr.savepoint():
+                self._write_carrier_updates(list(prepared.values()))
+        except (UserError, ValidationError):
+            self.env.invalidate_all()
+            # Apply the updates one by one to report the ones that fail
+            for index, update in prepared.items():
+                try:
+                    with self.env.cr.savepoint():
+                        self._write_carrier_updates([update])
+                except (UserError, ValidationError) as e:
+                    self.env.invalidate_all()
+                    failures[index] = str(e)
+        if tracked_fnames:
+            shipments._message_log_tracking_batch(tracked_fnames, initial_values)
+
+        reference_by_id = {shipment_id: reference for reference, shipment_id in by_reference.items()}
+        for index, (shipment_ids, _vals, _events) in prepared.items():
+            result = results[index]
+            result['shipments'] = [reference_by_id[shipment_id] for shipment_id in shipment_ids]
+            if index in failures:
+                result.update(status='error', error=failures[index])
+        return results
+
+    @api.model
+    def _write_carrier_updates(self, updates):
+        """Write the values and ingest the milestones of prepared updates
+
+        ``updates`` are (shipment ids, values, events) tuples, applied in
+        order. The values are merged per shipment and the shipments
+        receiving the same values are written together. Raises a
+        ``UserError`` when a milestone is rejected, so that the caller's
+        savepoint also drops the dates of its update.
+        """
+        vals_by_shipment = defaultdict(dict)
+        events = []
+        for shipment_ids, vals, update_events in updates:
+            for shipment_id in shipment_ids:
+                vals_by_shipment[shipment_id].update(vals)
+            events += update_events
+        shipments_by_vals = defaultdict(list)
+        for shipment_id, vals in vals_by_shipment.items():
+            if vals:
+                shipments_by_vals[tuple(sorted(vals.items()))].append(shipment_id)
+        for vals, shipment_ids in shipments_by_vals.items():
+            self.browse(shipment_ids).with_context(mail_notrack=True).write(dict(vals))
+        if events:
+            ingest = self.env['freight.shipment.event']._ingest(events)
+            if ingest['rejected']:
+                raise UserError(ingest['rejected'][0]['error'])
@@ -5,21 +5,25 @@ from odoo.exceptions import ValidationError
 class FreightVessel(models.Model):
     _name = 'freight.vessel'
     _description = 'Freight Vessel Configuration'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['freight.master.data.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'name'
     _rec_name = 'name'
+    _code_label = 'Vessel'
+    _display_name_depends = ['code', 'name', 'country_id.code']
 
     code = fields.Char(
         string='Vessel Code',
         required=True,
         size=20,
         tracking=True,
+        index='trigram',
         help='Unique vessel identification code'
     )
     name = fields.Char(
         string='Vessel Name',
         required=True,
         tracking=True,
+        index='trigram',
         help='Full name of the vessel'
     )
     country_id = fields.Many2one(
@@ -117,13 +121,6 @@ class FreightVessel(models.Model):
         help='Additional information about the vessel'
     )
 
-    @api.constrains('code')
-    def _check_unique_code(self):
-        """Ensure vessel code is unique"""
-        for record in self:
-            if self.search_count([('code', '=', record.code), ('id', '!=', record.id)]) > 0:
-                raise ValidationError(_('Vessel code must be unique. Code "%s" already exists.') % record.code)
-
     @api.constrains('imo_number')
     def _check_imo_number(self):
         """Validate IMO number format"""
@@ -133,7 +130,7 @@ class FreightVessel(models.Model):
                 if not record.imo_number.isdigit() or len(record.imo_number) != 7:
                     raise ValidationError(_('IMO number must be exactly 7 digits.'))
 
-    def name_get(self):
+    def _name_get_uncached(self):
         """Custom name display: [CODE] Name"""
         result = []
         for record in self:
@@ -142,14 +139,3 @@ class FreightVessel(models.Model):
                 name += f" ({record.country_id.code})"
             result.append((record.id, name))
         return result
-
-    @api.model
-    def name_search(self, name='', args=None, operator='ilike', limit=100):
-        """Enhanced search by code or name"""
-        args = args or []
-        if name:
-            vessels = self.search([
-                '|', ('code', operator, name), ('name', operator, name)
-            ] + args, limit=limit)
-            return vessels.name_get()
-        return super().name_search(name, args, operator, limit)
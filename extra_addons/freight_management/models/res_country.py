@@ -0,0 +1,12 @@
+from odoo import models
+
+
+class ResCountry(models.Model):
+    _inherit = 'res.country'
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Port, vessel and airline labels include the country
+        if {'name', 'code'}.intersection(vals):
+            self.env['freight.master.data.mixin']._invalidate_related_master_data('country_id')
+        return res
@@ -0,0 +1,23 @@
+from odoo import models, api
+
+from .freight_cost import CURRENCY_RATE_CACHE
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    def _invalidate_freight_rate_cache(self):
+        self.env.cr.cache.pop(CURRENCY_RATE_CACHE, None)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._invalidate_freight_rate_cache()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._invalidate_freight_rate_cache()
+        return super().write(vals)
+
+    def unlink(self):
+        self._invalidate_freight_rate_cache()
+        return super().unlink()
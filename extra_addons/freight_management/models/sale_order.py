@@ -11,6 +11,27 @@ class SaleOrder(models.Model):
         help='Freight quotation that generated this sale order'
     )
     
+    def _get_freight_invoice_counts(self, move_types=('out_invoice', 'out_refund')):
+        """Number of invoices of each order, for the whole recordset at once
+
+        :return: dict {sale order id: invoice count}
+        """
+        if not self.ids:
+            return {}
+        self.env['sale.order.line'].flush_model(['order_id', 'invoice_lines'])
+        self.env['account.move.line'].flush_model(['move_id'])
+        self.env['account.move'].flush_model(['move_type'])
+        self.env.cr.execute("""
+            SELECT sol.order_id, COUNT(DISTINCT aml.move_id)
+              FROM sale_order_line sol
+              JOIN sale_order_line_invoice_rel rel ON rel.order_line_id = sol.id
+              JOIN account_move_line aml ON aml.id = rel.invoice_line_id
+              JOIN account_move am ON am.id = aml.move_id
+             WHERE sol.order_id = ANY(%s) AND am.move_type IN %s
+          GROUP BY sol.order_id
+        """, (self.ids, tuple(move_types)))
+        return dict(self.env.cr.fetchall())
+
     def action_view_freight_quotation(self):
         """Smart button to view related freight quotation"""
         if not self.freight_quotation_id:
@@ -0,0 +1 @@
+from . import freight_profit_report
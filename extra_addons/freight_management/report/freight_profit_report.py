@@ -0,0 +1,254 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+WATERMARK_PARAM = 'freight_management.profit_report_watermark'
+# Re-read changes slightly before the watermark to catch transactions that
+# committed after the previous refresh started, upserts are idempotent.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+class FreightProfitReport(models.Model):
+    _name = 'freight.profit.report'
+    _description = 'Freight Profitability Analysis'
+    _order = 'date desc, id'
+    _rec_name = 'shipment_id'
+    _log_access = False
+
+    cost_line_id = fields.Many2one(
+        'freight.cost.line',
+        string='Cost Line',
+        readonly=True,
+        ondelete='cascade'
+    )
+    
+    shipment_id = fields.Many2one(
+        'freight.shipment',
+        string='Shipment',
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    
+    archive_shipment_id = fields.Many2one(
+        'freight.shipment.archive',
+        string='Archived Shipment',
+        readonly=True,
+        index='btree_not_null',
+        ondelete='cascade',
+        help='Set once the shipment was moved to the archive, its rows are kept for reporting'
+    )
+    
+    date = fields.Date(
+        string='Month',
+        readonly=True
+    )
+    
+    origin_port_id = fields.Many2one(
+        'freight.port',
+        string='Origin Port',
+        readonly=True
+    )
+    
+    destination_port_id = fields.Many2one(
+        'freight.port',
+        string='Destination Port',
+        readonly=True
+    )
+    
+    transport_mode = fields.Selection([
+        ('air', 'Air Freight'),
+        ('ocean', 'Ocean Freight'),
+        ('land', 'Land Freight')
+    ], string='Transport Mode', readonly=True)
+    
+    direction = fields.Selection([
+        ('import', 'Import'),
+        ('export', 'Export')
+    ], string='Direction', readonly=True)
+    
+    service_type = fields.Selection([
+        ('fcl', 'Full Container Load (FCL)'),
+        ('lcl', 'Less than Container Load (LCL)'),
+        ('ftl', 'Full Truck Load (FTL)'),
+        ('ltl', 'Less than Truck Load (LTL)'),
+        ('air_freight', 'Air Freight'),
+        ('express', 'Express Service')
+    ], string='Service Type', readonly=True)
+    
+    customer_id = fields.Many2one(
+        'res.partner',
+        string='Customer',
+        readonly=True
+    )
+    
+    product_id = fields.Many2one(
+        'product.product',
+        string='Service Product',
+        readonly=True
+    )
+    
+    vendor_id = fields.Many2one(
+        'res.partner',
+        string='Vendor',
+        readonly=True
+    )
+    
+    cost_type = fields.Selection([
+        ('sell', 'Sell Cost (Customer)'),
+        ('buy', 'Buy Cost (Vendor)')
+    ], string='Cost Type', readonly=True)
+    
+    currency_id = fields.Many2one(
+        'res.currency',
+        string='Currency',
+        readonly=True
+    )
+    
+    sell_amount = fields.Monetary(
+        string='Sell Amount',
+        currency_field='currency_id',
+        readonly=True
+    )
+    
+    buy_amount = fields.Monetary(
+        string='Buy Amount',
+        currency_field='currency_id',
+        readonly=True
+    )
+    
+    margin = fields.Monetary(
+        string='Margin',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    def init(self):
+        super().init()
+        tools.create_unique_index(
+            self.env.cr, 'freight_profit_report_cost_line_id_uniq', self._table, ['cost_line_id']
+        )
+        tools.create_index(self.env.cr, 'freight_profit_report_date_idx', self._table, ['date'])
+
+    @api.model
+    def _rate_sql(self, currency_column):
+        """Company rate of ``currency_column`` at the shipment booking date
+
+        Same rule as ``res.currency._get_rates``: the last rate on or before
+        the date, else the first one after it, else 1.
+
+        :param SQL currency_column: the currency column, e.g.
+            ``SQL.identifier('s', 'currency_id')``
+        """
+        return SQL("""
+            COALESCE((
+                SELECT r.rate
+                  FROM res_currency_rate r
+                 WHERE r.currency_id = %s
+                   AND (r.company_id = %s OR r.company_id IS NULL)
+              ORDER BY r.name <= COALESCE(s.booking_date, s.create_date)::date DESC,
+                       CASE WHEN r.name <= COALESCE(s.booking_date, s.create_date)::date THEN r.name END DESC,
+                       r.name, r.company_id NULLS LAST
+                 LIMIT 1
+            ), 1.0)
+        """, currency_column, self.env.company.id)
+
+    @api.model
+    def _refresh(self, since=None):
+        """Upsert the report rows of cost lines changed after ``since``
+
+        A cost line is refreshed when it or its shipment was written after
+        the watermark, both sets being read from their ``write_date``
+        indexes. Amounts are converted to the shipment currency at
+        its booking date. Deleted lines and shipments drop their rows through
+        the cascading foreign keys, rows of archived shipments are detached
+        from the hot records and left untouched. Without ``since`` every
+        current row is rebuilt.
+        """
+        self.env.flush_all()
+        if since:
+            condition = SQL("""
+                l.id IN (
+                    SELECT id FROM freight_cost_line WHERE write_date > %s
+                     UNION
+                    SELECT cl.id
+                      FROM freight_shipment cs
+                      JOIN freight_cost_line cl ON cl.shipment_id = cs.id
+                     WHERE cs.write_date > %s
+                )
+            """, since, since)
+            # Moving a line off its shipment writes the line
+            moved_condition = SQL("l.write_date > %s", since)
+        else:
+            condition = moved_condition = SQL("TRUE")
+        self.env.cr.execute(SQL("""
+            INSERT INTO freight_profit_report (
+                cost_line_id, shipment_id, date, origin_port_id, destination_port_id,
+                transport_mode, direction, service_type, customer_id, product_id, vendor_id,
+                cost_type, currency_id, sell_amount, buy_amount, margin
+            )
+            SELECT l.id, s.id,
+                   date_trunc('month', COALESCE(s.booking_date, s.create_date))::date,
+                   s.origin_port_id, s.destination_port_id,
+                   s.transport_mode, s.direction, s.service_type, s.customer_id, l.product_id,
+                   CASE WHEN l.cost_type = 'buy' THEN l.partner_id END,
+                   l.cost_type, s.currency_id,
+                   CASE WHEN l.cost_type = 'sell' THEN a.amount ELSE 0 END,
+                   CASE WHEN l.cost_type = 'buy' THEN a.amount ELSE 0 END,
+                   CASE WHEN l.cost_type = 'sell' THEN a.amount ELSE -a.amount END
+              FROM freight_cost_line l
+              JOIN freight_shipment s ON s.id = l.shipment_id
+             CROSS JOIN LATERAL (
+                    SELECT COALESCE(l.amount, 0) * CASE
+                        WHEN l.currency_id IS NULL OR s.currency_id IS NULL OR l.currency_id = s.currency_id THEN 1.0
+                        ELSE %s / %s
+                    END AS amount
+                   ) a
+             WHERE %s
+            ON CONFLICT (cost_line_id) DO UPDATE SET
+                shipment_id = EXCLUDED.shipment_id,
+                date = EXCLUDED.date,
+                origin_port_id = EXCLUDED.origin_port_id,
+                destination_port_id = EXCLUDED.destination_port_id,
+                transport_mode = EXCLUDED.transport_mode,
+                direction = EXCLUDED.direction,
+                service_type = EXCLUDED.service_type,
+                customer_id = EXCLUDED.customer_id,
+                product_id = EXCLUDED.product_id,
+                vendor_id = EXCLUDED.vendor_id,
+                cost_type = EXCLUDED.cost_type,
+                currency_id = EXCLUDED.currency_id,
+                sell_amount = EXCLUDED.sell_amount,
+                buy_amount = EXCLUDED.buy_amount,
+                margin = EXCLUDED.margin
+        """,
+            self._rate_sql(SQL.identifier('s', 'currency_id')),
+            self._rate_sql(SQL.identifier('l', 'currency_id')),
+            condition,
+        ))
+        upserted = self.env.cr.rowcount
+        # Lines moved off their shipment (e.g. back to a quotation)
+        self.env.cr.execute(SQL("""
+            DELETE FROM freight_profit_report r
+             USING freight_cost_line l
+             WHERE r.cost_line_id = l.id AND l.shipment_id IS NULL AND %s
+        """, moved_condition))
+        self.invalidate_model()
+        return upserted
+
+    @api.model
+    def _cron_refresh(self):
+        """Incrementally refresh the report from the last watermark"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        self.env.cr.execute("SELECT now() at time zone 'UTC'")
+        started_at = self.env.cr.fetchone()[0]
+        watermark = ICP.get_param(WATERMARK_PARAM)
+        since = fields.Datetime.to_datetime(watermark) - WATERMARK_OVERLAP if watermark else None
+        upserted = self._refresh(since=since)
+        ICP.set_param(WATERMARK_PARAM, fields.Datetime.to_string(started_at))
+        _logger.info("Freight profit report: %s rows refreshed", upserted)
+        return upserted
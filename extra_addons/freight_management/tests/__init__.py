@@ -0,0 +1 @@
+from . import test_freight_performance
@@ -0,0 +1,250 @@
+import time
+from contextlib import contextmanager
+
+from odoo import Command
+from odoo.tests import tagged, TransactionCase
+
+# Fixed dataset sizes shared by the tests
+BATCH_SIZE = 20
+LINES_PER_RECORD = 5
+LARGE_LINE_COUNT = 2000
+
+# Extra queries a batch may issue on top of a single record (sequence block,
+# mail followers, cache misses on related records, ...); anything above this
+# means some query runs once per record again
+BATCH_QUERY_SLACK = 10
+
+# Wall-time limits in seconds, wide enough for a loaded CI runner
+TIME_LIMIT_WRITE = 10.0
+TIME_LIMIT_READ = 2.0
+
+
+@tagged('post_install', '-at_install', 'freight_perf')
+class TestFreightPerformance(TransactionCase):
+    """Query-count and wall-time budgets for the freight hot paths
+
+    Run with ``--test-tags freight_perf``. Every path is measured against
+    the same operation on a single record so that per-record queries fail
+    the suite: write paths get a small slack, read paths none at all.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        country = cls.env.ref('base.ae')
+        cls.customer = cls.env['res.partner'].create({'name': 'Perf Customer', 'is_company': True})
+        cls.single_customer = cls.env['res.partner'].create({'name': 'Perf Single Customer', 'is_company': True})
+        cls.vendor = cls.env['res.partner'].create({'name': 'Perf Carrier', 'is_company': True})
+        cls.ports = cls.env['freight.port'].create([{
+            'code': 'PRF%03d' % i,
+            'name': 'Perf Port %s' % i,
+            'country_id': country.id,
+            'air_supported': True,
+            'ocean_supported': True,
+            'land_supported': True,
+        } for i in range(50)])
+        cls.vessels = cls.env['freight.vessel'].create([{
+            'code': 'PRV%03d' % i,
+            'name': 'Perf Vessel %s' % i,
+            'country_id': country.id,
+        } for i in range(50)])
+        cls.airlines = cls.env['freight.airline'].create([{
+            'code': 'PA%03d' % i,
+            'name': 'Perf Airline %s' % i,
+            'country_id': country.id,
+        } for i in range(50)])
+        # incoterm codes must be alphabetic: PIAA, PIAB, ...
+        cls.incoterms = cls.env['freight.incoterm'].create([{
+            'code': 'PI' + chr(ord('A') + i // 26) + chr(ord('A') + i % 26),
+            'name': 'Perf Incoterm %s' % i,
+        } for i in range(50)])
+        cls.containers = cls.env['freight.container'].create([{
+            'code': 'PC%03d' % i,
+            'name': 'Perf Container %s' % i,
+            'length': 5.9,
+            'width': 2.35,
+            'height': 2.39,
+        } for i in range(50)])
+        cls.product = cls.env.ref('freight_management.product_freight_charges')
+
+    # ------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------
+
+    @contextmanager
+    def assertTimeLimit(self, seconds):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        self.assertLessEqual(elapsed, seconds, "Took %.2fs, limit is %.2fs" % (elapsed, seconds))
+
+    def _count_queries(self, func):
+        """Number of queries issued by ``func``, caches emptied beforehand"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        start = self.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.cr.sql_log_count - start
+
+    def _cost_line_vals(self, count=LINES_PER_RECORD):
+        return [Command.create({
+            'cost_type': 'sell' if i % 2 else 'buy',
+            'product_id': self.product.id,
+            'description': 'Perf line %s' % i,
+            'partner_id': self.vendor.id,
+            'quantity': 1.0,
+            'unit_price': 100.0 + i,
+            'amount': 100.0 + i,
+        }) for i in range(count)]
+
+    def _route_vals(self, count, **extra):
+        """Create values shared by shipments and quotations"""
+        return [dict({
+            'customer_id': self.customer.id,
+            'origin_port_id': self.ports[i % 25].id,
+            'destination_port_id': self.ports[25 + i % 25].id,
+            'transport_mode': 'ocean',
+            'direction': 'export',
+            'cargo_description': 'Perf cargo',
+        }, **extra) for i in range(count)]
+
+    def _confirmed_quotations(self, count):
+        quotations = self.env['freight.quotation'].create(
+            self._route_vals(count, cost_line_ids=self._cost_line_vals())
+        )
+        quotations.action_confirm()
+        return quotations
+
+    def _assert_batch_budget(self, single, batch):
+        """Run ``batch`` within the query budget measured for ``single``"""
+        budget = self._count_queries(single) + BATCH_QUERY_SLACK
+        self.env.flush_all()
+        self.env.invalidate_all()
+        with self.assertQueryCount(budget), self.assertTimeLimit(TIME_LIMIT_WRITE):
+            batch()
+
+    def _assert_read_budget(self, single, batch):
+        """Run ``batch`` with no more queries than measured for ``single``"""
+        budget = self._count_queries(single)
+        self.env.flush_all()
+        self.env.invalidate_all()
+        with self.assertQueryCount(budget), self.assertTimeLimit(TIME_LIMIT_READ):
+            batch()
+
+    # ------------------------------------------------------------
+    # Write paths
+    # ------------------------------------------------------------
+
+    def test_shipment_create(self):
+        Shipment = self.env['freight.shipment']
+        self._assert_batch_budget(
+            lambda: Shipment.create(self._route_vals(1, cost_line_ids=self._cost_line_vals())),
+            lambda: Shipment.create(self._route_vals(BATCH_SIZE, cost_line_ids=self._cost_line_vals())),
+        )
+
+    def test_quotation_create(self):
+        Quotation = self.env['freight.quotation']
+        self._assert_batch_budget(
+            lambda: Quotation.create(self._route_vals(1, cost_line_ids=self._cost_line_vals())),
+            lambda: Quotation.create(self._route_vals(BATCH_SIZE, cost_line_ids=self._cost_line_vals())),
+        )
+
+    def test_quotation_action_confirm(self):
+        Quotation = self.env['freight.quotation']
+        single = Quotation.create(self._route_vals(1, cost_line_ids=self._cost_line_vals()))
+        batch = Quotation.create(self._route_vals(BATCH_SIZE, cost_line_ids=self._cost_line_vals()))
+        self._assert_batch_budget(single.action_confirm, batch.action_confirm)
+        self.assertEqual(len(batch.sale_order_id), BATCH_SIZE)
+
+    def test_quotation_action_create_shipment(self):
+        single = self._confirmed_quotations(1)
+        batch = self._confirmed_quotations(BATCH_SIZE)
+        self._assert_batch_budget(single.action_create_shipment, batch.action_create_shipment)
+        self.assertEqual(len(batch.shipment_id), BATCH_SIZE)
+        self.assertEqual(len(batch.shipment_id.cost_line_ids), BATCH_SIZE * LINES_PER_RECORD)
+
+    # ------------------------------------------------------------
+    # Read paths
+    # ------------------------------------------------------------
+
+    def test_compute_total_costs_large(self):
+        Shipment = self.env['freight.shipment']
+        CostLine = self.env['freight.cost.line']
+        single = Shipment.create(self._route_vals(1))
+        CostLine.create([{
+            'shipment_id': single.id,
+            'cost_type': cost_type,
+            'description': 'Perf line',
+            'amount': 10.0,
+        } for cost_type in ('sell', 'buy')])
+        shipments = Shipment.create(self._route_vals(BATCH_SIZE))
+        # every shipment gets the same number of sell and buy lines
+        CostLine.create([{
+            'shipment_id': shipments[i % BATCH_SIZE].id,
+            'cost_type': 'sell' if (i // BATCH_SIZE) % 2 else 'buy',
+            'description': 'Perf line %s' % i,
+            'amount': 10.0,
+        } for i in range(LARGE_LINE_COUNT)])
+        # one grouped query on the cost lines, whatever the number of
+        # shipments and lines
+        self._assert_read_budget(single._compute_total_costs, shipments._compute_total_costs)
+        expected = LARGE_LINE_COUNT / BATCH_SIZE / 2 * 10.0
+        self.assertEqual(shipments[0].total_sell_cost, expected)
+        self.assertEqual(shipments[0].total_buy_cost, expected)
+        self.assertEqual(shipments[0].profit_margin, 0.0)
+
+    def test_master_data_name_search(self):
+        for model in ('freight.port', 'freight.vessel', 'freight.airline', 'freight.incoterm', 'freight.container'):
+            with self.subTest(model=model):
+                Model = self.env[model]
+                self.assertEqual(len(Model.name_search('Perf', limit=20)), 20)
+                # same ranked stages (exact code, prefix, substring) for one
+                # or many results, display names come from the master data cache
+                self._assert_read_budget(
+                    lambda: Model.name_search('Perf', limit=1),
+                    lambda: Model.name_search('Perf', limit=20),
+                )
+
+    def test_shipment_list_read(self):
+        Shipment = self.env['freight.shipment']
+        Shipment.create(self._route_vals(BATCH_SIZE, cost_line_ids=self._cost_line_vals()))
+        Shipment.create(self._route_vals(1, customer_id=self.single_customer.id, cost_line_ids=self._cost_line_vals()))
+        specification = {
+            fname: {} for fname in (
+                'reference', 'transport_mode', 'direction', 'service_type', 'state',
+                'booking_date', 'total_sell_cost', 'profit_margin',
+            )
+        }
+        specification.update({
+            fname: {'fields': {'display_name': {}}}
+            for fname in ('customer_id', 'origin_port_id', 'destination_port_id')
+        })
+        # search, main read, partner names, port names: one query each
+        # whatever the number of rows
+        self._assert_read_budget(
+            lambda: Shipment.web_search_read([('customer_id', '=', self.single_customer.id)], specification, limit=80),
+            lambda: Shipment.web_search_read([('customer_id', '=', self.customer.id)], specification, limit=80),
+        )
+        result = Shipment.web_search_read([('customer_id', '=', self.customer.id)], specification, limit=80)
+        self.assertGreaterEqual(result['length'], BATCH_SIZE)
+
+    def test_shipment_kanban_read(self):
+        Shipment = self.env['freight.shipment']
+        Shipment.create(self._route_vals(BATCH_SIZE, cost_line_ids=self._cost_line_vals()))
+        Shipment.create(self._route_vals(1, customer_id=self.single_customer.id, cost_line_ids=self._cost_line_vals()))
+        specification = {
+            fname: {} for fname in ('reference', 'transport_mode', 'state', 'total_sell_cost', 'profit_margin')
+        }
+        specification.update({
+            fname: {'fields': {'display_name': {}}}
+            for fname in ('customer_id', 'origin_port_id', 'destination_port_id')
+        })
+
+        def open_kanban(customer):
+            # grouped columns, then each column opened with its own records
+            groups = Shipment.web_read_group([('customer_id', '=', customer.id)], ['state'], ['state'])
+            for group in groups['groups']:
+                Shipment.web_search_read(group['__domain'], specification, limit=40)
+
+        self._assert_read_budget(lambda: open_kanban(self.single_customer), lambda: open_kanban(self.customer))
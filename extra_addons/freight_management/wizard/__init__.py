@@ -0,0 +1,2 @@
+from . import freight_shipment_mass_update
+from . import freight_shipment_import
@@ -0,0 +1,310 @@
+import csv
+import io
+import logging
+import threading
+from collections import defaultdict
+from itertools import groupby
+
+import psycopg2
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Shipment columns of the import file, repeated on every cost line row
+SHIPMENT_COLUMNS = [
+    'shipment_ref', 'customer', 'origin_port', 'destination_port', 'transport_mode',
+    'direction', 'service_type', 'cargo_description', 'total_weight', 'total_volume',
+    'vessel', 'airline', 'voyage_flight_number', 'estimated_departure', 'estimated_arrival',
+]
+# Cost line columns, one cost line per row
+COST_LINE_COLUMNS = ['cost_type', 'product', 'description', 'quantity', 'unit_price', 'partner']
+# Errors reported on the rows of a shipment, anything else aborts the import
+IMPORT_ERRORS = (UserError, ValueError, psycopg2.IntegrityError, psycopg2.DataError)
+
+
+class FreightShipmentImport(models.TransientModel):
+    _name = 'freight.shipment.import'
+    _description = 'Freight Shipment Import'
+
+    import_file = fields.Binary(
+        string='File',
+        required=True,
+        attachment=True,
+        help='CSV file with one row per cost line. Rows of the same shipment '
+             'share the same shipment_ref and must be consecutive.'
+    )
+    
+    filename = fields.Char(
+        string='Filename'
+    )
+    
+    chunk_size = fields.Integer(
+        string='Shipments per Chunk',
+        default=500,
+        help='Number of shipments resolved, created and committed together'
+    )
+    
+    imported_count = fields.Integer(
+        string='Imported Shipments',
+        readonly=True
+    )
+
+    skipped_count = fields.Integer(
+        string='Already Imported',
+        readonly=True,
+        help='Shipments of the file found with the same reference, left untouched'
+    )
+    
+    error_report = fields.Text(
+        string='Errors',
+        readonly=True
+    )
+
+    def action_import(self):
+        """Import the uploaded file and show the result"""
+        self.ensure_one()
+        if self.chunk_size <= 0:
+            raise UserError(_('The chunk size must be positive.'))
+        with io.TextIOWrapper(self._open_import_file(), encoding='utf-8-sig', newline='') as stream:
+            imported, skipped, errors = self._import_stream(stream, self.chunk_size)
+        self.write({
+            'imported_count': imported,
+            'skipped_count': skipped,
+            'error_report': '\n'.join(
+                _('Line %(line)s (%(ref)s): %(message)s', line=line, ref=ref, message=message)
+                for line, ref, message in errors
+            ),
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def _open_import_file(self):
+        """Binary stream of the uploaded file, read from the file store"""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'import_file'),
+        ], limit=1)
+        if not attachment:
+            raise UserError(_('Please upload a file to import.'))
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        # Attachments kept in the database are only read in one piece
+        return io.BytesIO(attachment.raw)
+
+    @api.model
+    def _import_stream(self, stream, chunk_size=500):
+        """Import shipments and their cost lines from a CSV text stream
+
+        The stream is read lazily and processed ``chunk_size`` shipments at a
+        time, so memory use does not depend on the file size. Each chunk
+        resolves all its references with one query per model, creates its
+        shipments and cost lines in two batches and is committed. Shipments
+        whose reference was already imported are skipped, so a file can be
+        imported again after a failure.
+
+        :return: tuple (number of imported shipments, number of skipped
+            shipments, [(line, ref, message)])
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        reader = csv.DictReader(stream)
+        missing = {
+            'shipment_ref', 'customer', 'origin_port', 'destination_port', 'transport_mode', 'direction',
+        } - set(reader.fieldnames or [])
+        if missing:
+            raise UserError(_('Missing columns: %s', ', '.join(sorted(missing))))
+        imported, skipped, errors = 0, 0, []
+        for chunk in self._read_chunks(reader, chunk_size):
+            chunk_imported, chunk_skipped, chunk_errors = self._import_chunk(chunk)
+            imported += chunk_imported
+            skipped += chunk_skipped
+            errors += chunk_errors
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+            _logger.info(
+                "Freight import: %s shipments imported, %s skipped, %s errors", imported, skipped, len(errors)
+            )
+        return imported, skipped, errors
+
+    @api.model
+    def _read_chunks(self, reader, chunk_size):
+        """Yield lists of (shipment_ref, [(line number, row)]) of bounded size"""
+        numbered_rows = ((reader.line_num, row) for row in reader)
+        chunk = []
+        for ref, rows in groupby(numbered_rows, key=lambda item: (item[1].get('shipment_ref') or '').strip()):
+            chunk.append((ref, list(rows)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @api.model
+    def _lookup(self, model, fname, keys, extra_fname=None):
+        """Map keys to the ids matching them with one query
+
+        A key matching ``extra_fname`` is resolved on that field only,
+        otherwise on ``fname``. Keys matching several records map to all of
+        them and are reported by :meth:`_resolve`.
+        """
+        keys = {key for key in keys if key}
+        if not keys:
+            return {}
+        domain = [(fname, 'in', list(keys))]
+        if extra_fname:
+            domain = ['|', (extra_fname, 'in', list(keys))] + domain
+        by_extra, by_fname = defaultdict(list), defaultdict(list)
+        for values in self.env[model].search_read(domain, [fname] + ([extra_fname] if extra_fname else [])):
+            if extra_fname and values[extra_fname] in keys:
+                by_extra[values[extra_fname]].append(values['id'])
+            if values[fname] in keys:
+                by_fname[values[fname]].append(values['id'])
+        return {key: by_extra.get(key) or by_fname.get(key) for key in keys if key in by_extra or key in by_fname}
+
+    @api.model
+    def _resolve(self, mapping, key, label):
+        """Id of the record matching ``key``, an error if none or several do"""
+        ids = mapping.get(key)
+        if not ids:
+            raise UserError(_('%(label)s "%(key)s" not found.', label=label, key=key))
+        if len(ids) > 1:
+            raise UserError(_('%(label)s "%(key)s" matches several records.', label=label, key=key))
+        return ids[0]
+
+    @api.model
+    def _get_imported_refs(self, refs):
+        """References among ``refs`` already imported, archived shipments included"""
+        imported = set()
+        for model in ('freight.shipment', 'freight.shipment.archive'):
+            imported.update(self.env[model].sudo().search([('import_ref', 'in', refs)]).mapped('import_ref'))
+        return imported
+
+    @api.model
+    def _import_chunk(self, chunk):
+        """Resolve, validate and create one chunk of shipments"""
+        rows = [row for _ref, lines in chunk for _line, row in lines]
+
+        def column(name):
+            return [(row.get(name) or '').strip() for row in rows]
+
+        ports = self._lookup('freight.port', 'code', column('origin_port') + column('destination_port'))
+        vessels = self._lookup('freight.vessel', 'code', column('vessel'))
+        airlines = self._lookup('freight.airline', 'code', column('airline'))
+        partners = self._lookup('res.partner', 'name', column('customer') + column('partner'), extra_fname='ref')
+        products = self._lookup('product.product', 'default_code', column('product'))
+
+        imported_refs = self._get_imported_refs([ref for ref, _lines in chunk if ref])
+
+        errors, skipped, seen_refs = [], 0, set()
+        shipment_vals, cost_line_vals, first_lines = [], [], []
+        for ref, lines in chunk:
+            first_line, head = lines[0]
+            if ref and (ref in imported_refs or ref in seen_refs):
+                skipped += 1
+                continue
+            seen_refs.add(ref)
+            try:
+                if not ref:
+                    raise UserError(_('Shipment reference is required.'))
+                vals = self._prepare_import_shipment_vals(head, ports, vessels, airlines, partners)
+                vals['import_ref'] = ref
+                line_vals = [
+                    self._prepare_import_cost_line_vals(row, products, partners) for _line, row in lines
+                    if (row.get('product') or row.get('description') or '').strip()
+                ]
+            except IMPORT_ERRORS as e:
+                errors.append((first_line, ref, str(e)))
+                continue
+            shipment_vals.append(vals)
+            cost_line_vals.append(line_vals)
+            first_lines.append((first_line, ref))
+
+        imported = self._create_import_records(shipment_vals, cost_line_vals, first_lines, errors)
+        return imported, skipped, errors
+
+    @api.model
+    def _create_import_records(self, shipment_vals, cost_line_vals, first_lines, errors):
+        """Create shipments and lines in batch, isolating failing shipments"""
+        Shipment = self.env['freight.shipment']
+        CostLine = self.env['freight.cost.line']
+        try:
+            with self.env.cr.savepoint():
+                shipments = Shipment.create(shipment_vals)
+                CostLine.create([
+                    dict(vals, shipment_id=shipment.id)
+                    for shipment, line_vals in zip(shipments, cost_line_vals) for vals in line_vals
+                ])
+            return len(shipments)
+        except IMPORT_ERRORS:
+            self.env.invalidate_all()
+        # Retry one shipment at a time to report the rows that fail
+        imported = 0
+        for vals, line_vals, (first_line, ref) in zip(shipment_vals, cost_line_vals, first_lines):
+            try:
+                with self.env.cr.savepoint():
+                    shipment = Shipment.create([vals])
+                    CostLine.create([dict(line, shipment_id=shipment.id) for line in line_vals])
+                imported += 1
+            except IMPORT_ERRORS as e:
+                self.env.invalidate_all()
+                errors.append((first_line, ref, str(e)))
+        return imported
+
+    @api.model
+    def _prepare_import_shipment_vals(self, row, ports, vessels, airlines, partners):
+        """Shipment values from the shipment columns of an import row"""
+        def get(name, label=None):
+            value = (row.get(name) or '').strip()
+            if label and not value:
+                raise UserError(_('%s is required.', label))
+            return value
+
+        def resolve(mapping, name, label, required=False):
+            key = get(name)
+            if not key:
+                if required:
+                    raise UserError(_('%s is required.', label))
+                return False
+            return self._resolve(mapping, key, label)
+
+        return {
+            'customer_id': resolve(partners, 'customer', _('Customer'), required=True),
+            'origin_port_id': resolve(ports, 'origin_port', _('Origin port'), required=True),
+            'destination_port_id': resolve(ports, 'destination_port', _('Destination port'), required=True),
+            'transport_mode': get('transport_mode', _('Transport mode')),
+            'direction': get('direction', _('Direction')),
+            'service_type': get('service_type') or False,
+            'cargo_description': get('cargo_description') or 'General Cargo',
+            'total_weight': float(get('total_weight') or 0.0),
+            'total_volume': float(get('total_volume') or 0.0),
+            'vessel_id': resolve(vessels, 'vessel', _('Vessel')),
+            'airline_id': resolve(airlines, 'airline', _('Airline')),
+            'voyage_flight_number': get('voyage_flight_number') or False,
+            'estimated_departure': fields.Datetime.to_datetime(get('estimated_departure') or False),
+            'estimated_arrival': fields.Datetime.to_datetime(get('estimated_arrival') or False),
+        }
+
+    @api.model
+    def _prepare_import_cost_line_vals(self, row, products, partners):
+        """Cost line values from the cost line columns of an import row"""
+        product_code = (row.get('product') or '').strip()
+        partner = (row.get('partner') or '').strip()
+        quantity = float((row.get('quantity') or '').strip() or 1.0)
+        unit_price = float((row.get('unit_price') or '').strip() or 0.0)
+        return {
+            'cost_type': (row.get('cost_type') or '').strip() or 'sell',
+            'product_id': self._resolve(products, product_code, _('Product')) if product_code else False,
+            'description': (row.get('description') or '').strip() or product_code,
+            'partner_id': self._resolve(partners, partner, _('Partner')) if partner else False,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'amount': quantity * unit_price,
+        }
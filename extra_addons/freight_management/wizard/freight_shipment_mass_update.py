@@ -0,0 +1,85 @@
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+
+
+class FreightShipmentMassUpdate(models.TransientModel):
+    _name = 'freight.shipment.mass.update'
+    _description = 'Freight Shipment Mass Update'
+
+    shipment_ids = fields.Many2many(
+        'freight.shipment',
+        string='Shipments',
+        default=lambda self: self.env.context.get('active_ids')
+    )
+    
+    state = fields.Selection(
+        selection=lambda self: self.env['freight.shipment']._fields['state'].selection,
+        string='Status'
+    )
+    
+    vessel_id = fields.Many2one(
+        'freight.vessel',
+        string='Vessel'
+    )
+    
+    airline_id = fields.Many2one(
+        'freight.airline',
+        string='Airline'
+    )
+    
+    voyage_flight_number = fields.Char(
+        string='Voyage/Flight Number'
+    )
+    
+    estimated_departure = fields.Datetime(
+        string='Estimated Departure'
+    )
+    
+    estimated_arrival = fields.Datetime(
+        string='Estimated Arrival'
+    )
+
+    _update_fields = [
+        'state', 'vessel_id', 'airline_id', 'voyage_flight_number',
+        'estimated_departure', 'estimated_arrival',
+    ]
+
+    def _prepare_update_vals(self):
+        """Values to write, only the fields filled in the wizard"""
+        self.ensure_one()
+        vals = {}
+        for fname in self._update_fields:
+            if self[fname]:
+                vals[fname] = self._fields[fname].convert_to_write(self[fname], self)
+        return vals
+
+    def action_apply(self):
+        """Write the filled fields on all shipments with bulk tracking
+
+        Status changes go through the shipment transitions; shipments that
+        cannot reach the new status are listed in a notification.
+        """
+        self.ensure_one()
+        vals = self._prepare_update_vals()
+        if not vals:
+            raise UserError(_('Fill in at least one field to update.'))
+        shipments = self.shipment_ids.with_context(freight_bulk_tracking=True)
+        state = vals.pop('state', False)
+        if vals:
+            shipments.write(vals)
+        if not state:
+            return {'type': 'ir.actions.act_window_close'}
+        result = shipments.action_bulk_transition(state)
+        if not result['failed']:
+            return {'type': 'ir.actions.act_window_close'}
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('%s shipment(s) not updated', len(result['failed'])),
+                'message': '\n'.join(result['failed'].values()),
+                'type': 'warning',
+                'sticky': True,
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }